@@ -0,0 +1,55 @@
+"""Cost of resolving the current user from a token, with and without the
+verified claims cache.
+
+Calls `get_user_profile_by_email` in a loop for a handful of tokens whose
+users are already in the user cache, so no query is sent and the numbers
+show the per-request decode work alone. Runs without a database.
+
+    python -m benchmarks.auth_dependency --calls 100000 --tokens 100
+"""
+import argparse
+import asyncio
+import time
+import src.main
+import src.auth.utils as auth_utils
+from src.auth.models import User
+from src.database import async_session_maker
+from src.user_profile.utils import get_user_profile_by_email, cache_user
+from benchmarks.seed import user_email
+
+
+def make_tokens(count: int) -> list[str]:
+    tokens = []
+    for user_id in range(1, count + 1):
+        token = auth_utils.create_access_token(data={"sub": user_email(user_id)})
+        cache_user(token, auth_utils.decode_access_token(token), User(id=user_id, email=user_email(user_id), password=""))
+        tokens.append(token)
+    return tokens
+
+
+async def measure(tokens: list[str], calls: int) -> float:
+    async with async_session_maker() as db:
+        started = time.perf_counter()
+        for number in range(calls):
+            await get_user_profile_by_email(tokens[number % len(tokens)], db)
+        return time.perf_counter() - started
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=100_000)
+    parser.add_argument("--tokens", type=int, default=100)
+    args = parser.parse_args()
+
+    tokens = make_tokens(args.tokens)
+    claims_cache_size = auth_utils.token_claims_cache.maxsize
+
+    for name, maxsize in [("without claims cache", 0), ("with claims cache", claims_cache_size)]:
+        auth_utils.token_claims_cache.clear()
+        auth_utils.token_claims_cache.maxsize = maxsize
+        elapsed = await measure(tokens, args.calls)
+        print(f"{name:>22}: {args.calls / elapsed:10.0f} calls/s  {elapsed / args.calls * 1e6:7.2f} us/call")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable
+import httpx
+from src.auth.utils import create_access_token
+from benchmarks.seed import user_email
+
+
+def app_client(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark")
+
+
+def auth_headers(user_id: int) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': user_email(user_id)})}"}
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+async def run_scenario(call: Callable[[int], Awaitable[httpx.Response]], requests: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(number: int):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await call(number)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(timed(number) for number in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": requests / elapsed,
+        "p50": percentile(latencies, 0.50) * 1000,
+        "p95": percentile(latencies, 0.95) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+        "mean": statistics.fmean(latencies) * 1000,
+    }
+
+
+def print_report(name: str, result: dict):
+    print(
+        f"{name:>16}: {result['rps']:8.1f} req/s  "
+        f"p50 {result['p50']:7.1f}ms  p95 {result['p95']:7.1f}ms  p99 {result['p99']:7.1f}ms  "
+        f"errors {result['errors']}/{result['requests']}"
+    )
@@ -0,0 +1,56 @@
+"""Latency of an unrelated endpoint while logins hash passwords.
+
+Runs the probe endpoint alone, then again during a storm of logins, once
+with bcrypt on the event loop (`inline`) and once in the worker pool
+(`pool`). Needs a dataset from `benchmarks.seed`.
+
+    python -m benchmarks.login_storm --logins 200 --probes 200
+"""
+import argparse
+import asyncio
+import src.auth.utils as auth_utils
+from src.main import app
+from benchmarks.common import app_client, run_scenario, print_report
+from benchmarks.seed import add_dataset_arguments, user_email, PASSWORD
+
+
+async def run_inline(func, *args):
+    return func(*args)
+
+
+async def probe_during_storm(client, args, storm: bool) -> dict:
+    async def login(number: int):
+        user_id = number % args.users + 1
+        return await client.post("/api/auth/login/", json={"email": user_email(user_id), "password": PASSWORD})
+
+    probe = run_scenario(lambda number: client.get(args.probe), args.probes, args.probe_concurrency)
+    if not storm:
+        return await probe
+
+    _, result = await asyncio.gather(run_scenario(login, args.logins, args.login_concurrency), probe)
+    return result
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    add_dataset_arguments(parser)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--login-concurrency", type=int, default=50)
+    parser.add_argument("--probes", type=int, default=200)
+    parser.add_argument("--probe-concurrency", type=int, default=5)
+    parser.add_argument("--probe", default="/api/event/cities/")
+    args = parser.parse_args()
+
+    pooled = auth_utils.run_password_hashing
+    async with app_client(app) as client:
+        print_report("no storm", await probe_during_storm(client, args, storm=False))
+
+        auth_utils.run_password_hashing = run_inline
+        print_report("storm, inline", await probe_during_storm(client, args, storm=True))
+
+        auth_utils.run_password_hashing = pooled
+        print_report("storm, pool", await probe_during_storm(client, args, storm=True))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
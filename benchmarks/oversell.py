@@ -0,0 +1,82 @@
+"""Fire many simultaneous registrations at one slot and check nobody got a
+seat that wasn't there.
+
+The slot is the first slot of `--event`, limited to `--seats` seats for the
+run. Every registration comes from a different spare user, so only the
+seat limit can turn them away. Afterwards the bookings are removed and the
+slot gets its original seats back. Exits with status 1 on oversell. Needs a
+dataset from `benchmarks.seed` with at least `--registrations` spare users.
+
+    python -m benchmarks.oversell --registrations 500 --seats 50
+"""
+import argparse
+import asyncio
+import sys
+from sqlalchemy import select, update, delete, func
+from src.main import app
+from src.database import async_session_maker
+from src.events.models import EventDateTime, Booking
+from benchmarks.common import app_client, auth_headers, run_scenario, print_report
+from benchmarks.seed import add_dataset_arguments, spare_user_ids
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    add_dataset_arguments(parser)
+    parser.add_argument("--event", type=int, default=1, help="an open event, the seed closes every tenth")
+    parser.add_argument("--seats", type=int, default=50)
+    parser.add_argument("--registrations", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=500)
+    args = parser.parse_args()
+
+    # slot `event` is the first slot of event `event` in the seeded dataset
+    slot_id = args.event
+    users = list(spare_user_ids(args.users, args.spare_users))[:args.registrations]
+    if len(users) < args.registrations:
+        raise SystemExit("Every registration needs its own spare user, raise --spare-users")
+
+    async with async_session_maker() as db:
+        original_seats = await db.scalar(select(EventDateTime.seats_number).where(EventDateTime.id == slot_id))
+        await db.execute(update(EventDateTime).where(EventDateTime.id == slot_id).values(seats_number=args.seats))
+        await db.commit()
+
+    try:
+        async with app_client(app) as client:
+            result = await run_scenario(
+                lambda number: client.post(
+                    f"/api/event/register/{args.event}/",
+                    json={"event_date_time_id": slot_id},
+                    headers=auth_headers(users[number]),
+                ),
+                args.registrations,
+                args.concurrency,
+            )
+        print_report("register", result)
+
+        async with async_session_maker() as db:
+            seats_left = await db.scalar(select(EventDateTime.seats_number).where(EventDateTime.id == slot_id))
+            booked = await db.scalar(
+                select(func.count(Booking.id)).where(Booking.event_date_time_id == slot_id, Booking.user_id.in_(users))
+            )
+    finally:
+        async with async_session_maker() as db:
+            await db.execute(delete(Booking).where(Booking.event_date_time_id == slot_id, Booking.user_id.in_(users)))
+            await db.execute(update(EventDateTime).where(EventDateTime.id == slot_id).values(seats_number=original_seats))
+            await db.commit()
+
+    expected = min(args.seats, args.registrations)
+    print(f"seats {args.seats}, booked {booked}, seats left {seats_left}")
+    if booked > args.seats or seats_left < 0:
+        print("oversold")
+        sys.exit(1)
+    if seats_left != args.seats - booked:
+        print(f"seat counter drifted: expected {args.seats - booked} seats left")
+        sys.exit(1)
+    # failed registrations (e.g. timeouts) undersell, which is not a correctness bug
+    if booked < expected:
+        print(f"undersold: {expected - booked} seats went unbooked")
+    print("no oversell")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+"""Compare requests/sec of NullPool and the pooled engine.
+
+Every simulated request opens a session the way `get_async_session` does and
+runs the statements `/api/event/member/{event_id}/` issues, so the connect
+cost of each mode shows up the same way it does behind the API.
+
+    python -m benchmarks.pool_modes --requests 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+import time
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from src.auth.models import User, RevokedToken
+from src.events.models import Booking, EventDateTime
+from src.database import build_engine, warm_up_pool
+from src.config import DATABASE_URL_ASYNC
+
+
+async def simulate_request(session_maker: async_sessionmaker):
+    async with session_maker() as db:
+        await db.execute(select(RevokedToken.id).where(RevokedToken.token_digest == "benchmark"))
+        await db.execute(select(User.id).order_by(User.id).limit(1))
+        await db.execute(
+            select(func.count(Booking.id)).join(EventDateTime).where(EventDateTime.event_id == 1)
+        )
+
+
+async def run_mode(pool_mode: str, requests: int, concurrency: int, warmup: int):
+    engine = build_engine(DATABASE_URL_ASYNC, pool_mode)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await warm_up_pool(engine, warmup)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def worker():
+        async with semaphore:
+            await simulate_request(session_maker)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+
+    return requests / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=10)
+    args = parser.parse_args()
+
+    for pool_mode in ("null", "queue"):
+        rps = await run_mode(pool_mode, args.requests, args.concurrency, args.warmup)
+        print(f"{pool_mode:>5}: {rps:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,57 @@
+"""Check that the hot paths stay within their query budgets.
+
+Sends each request once, for a user that is not in the user cache yet, and
+fails when a path issues more statements than its budget. Registration and
+cancel-booking use the first spare user on the first open event, so the
+dataset is left as seeded. Needs a dataset from `benchmarks.seed`.
+
+    python -m benchmarks.query_budget
+"""
+import argparse
+import asyncio
+import sys
+from src.main import app
+from src.instrumentation import assert_max_queries
+from benchmarks.common import app_client, auth_headers
+from benchmarks.run import build_calls, open_event_ids
+from benchmarks.seed import add_dataset_arguments, spare_user_ids
+
+
+# the auth dependency costs one statement on a user cache miss
+QUERY_BUDGETS = {
+    "profile": 1,
+    "register": 3,
+    "cancel-booking": 4,
+}
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    add_dataset_arguments(parser)
+    args = parser.parse_args()
+
+    event_ids = open_event_ids(args.events, 1)
+    spare_users = spare_user_ids(args.users, args.spare_users)
+    failures = 0
+
+    async with app_client(app) as client:
+        calls = build_calls(client, args, event_ids, {}, spare_users)
+        # a spare user no other call has resolved, so the user cache is cold
+        calls["profile"] = lambda number: client.get("/api/profile/me/", headers=auth_headers(spare_users[-1]))
+
+        for name, limit in QUERY_BUDGETS.items():
+            try:
+                with assert_max_queries(limit) as stats:
+                    response = await calls[name](0)
+            except AssertionError as e:
+                failures += 1
+                print(f"{name:>16}: {e}")
+                continue
+            print(f"{name:>16}: {stats.count} of {limit} queries, status {response.status_code}")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+"""Registration throughput and the round trips each registration costs.
+
+Books spare users on the first slot of open events, filling every custom
+field of the event, and reports the queries sent per registration next to
+the usual throughput numbers. The bookings are cancelled afterwards through
+the API, which also gives the seats back. Needs a dataset from
+`benchmarks.seed`.
+
+    python -m benchmarks.registration --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import statistics
+from src.main import app
+from src.instrumentation import count_queries
+from benchmarks.common import app_client, auth_headers, run_scenario, print_report
+from benchmarks.run import open_event_ids
+from benchmarks.seed import add_dataset_arguments, spare_user_ids
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    add_dataset_arguments(parser)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    # one event per registration keeps the (user, slot) pairs distinct
+    event_ids = open_event_ids(args.events, args.requests)
+    spare_users = spare_user_ids(args.users, args.spare_users)
+    queries = []
+
+    def registered_user(number: int) -> int:
+        return spare_users[number % len(spare_users)]
+
+    async def register(client, number: int):
+        event_id = event_ids[number % len(event_ids)]
+        with count_queries() as stats:
+            # slot `event_id` is the first slot of every event in the seeded dataset
+            response = await client.post(
+                f"/api/event/register/{event_id}/",
+                json={
+                    "event_date_time_id": event_id,
+                    "custom_fields": [
+                        {"title": f"Поле {position + 1}", "value": "benchmark"} for position in range(args.custom_fields)
+                    ],
+                },
+                headers=auth_headers(registered_user(number)),
+            )
+        queries.append(stats.count)
+        return response
+
+    async with app_client(app) as client:
+        result = await run_scenario(lambda number: register(client, number), len(event_ids), args.concurrency)
+        print_report("register", result)
+        print(f"{'queries':>16}: {statistics.fmean(queries):.1f} per registration, {max(queries)} at most")
+
+        result = await run_scenario(
+            lambda number: client.delete(
+                f"/api/event/cancel-booking/{event_ids[number]}/",
+                headers=auth_headers(registered_user(number)),
+            ),
+            len(event_ids),
+            args.concurrency,
+        )
+        print_report("cancel-booking", result)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
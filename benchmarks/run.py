@@ -0,0 +1,109 @@
+"""Drive the API in-process against a dataset made by `benchmarks.seed`.
+
+Each scenario sends `--requests` requests with `--concurrency` in flight and
+reports throughput and latency percentiles. The register scenario books the
+spare users on the first slot of open events, cancel-booking removes those
+bookings again, so repeated runs leave the dataset as seeded.
+
+    python -m benchmarks.run --requests 500 --concurrency 20 view filter register cancel-booking
+"""
+import argparse
+import asyncio
+from sqlalchemy import select
+from src.main import app
+from src.database import async_session_maker
+from src.events.models import Event
+from benchmarks.common import app_client, auth_headers, run_scenario, print_report
+from benchmarks.seed import add_dataset_arguments, spare_user_ids, CITIES, WORDS
+
+
+SCENARIOS = ["view", "other", "participate", "filter", "cities", "event-detail", "register", "members", "cancel-booking"]
+
+
+def open_event_ids(events: int, count: int) -> list[int]:
+    # the seed closes every tenth event
+    return [event_id for event_id in range(1, events + 1) if event_id % 10 != 0][:count]
+
+
+async def load_creators(event_ids: list[int]) -> dict:
+    async with async_session_maker() as db:
+        result = await db.execute(select(Event.id, Event.creator_id).where(Event.id.in_(event_ids)))
+        return dict(result.all())
+
+
+def build_calls(client, args, event_ids: list[int], creators: dict, spare_users: range):
+    def booking_user(number: int) -> int:
+        # users seeded with bookings come before the spare ones
+        return number % (spare_users[0] - 1) + 1
+
+    def registered_user(number: int) -> int:
+        return spare_users[number % len(spare_users)]
+
+    def event_for(number: int) -> int:
+        return event_ids[number % len(event_ids)]
+
+    return {
+        "view": lambda number: client.get("/api/event/view/"),
+        "other": lambda number: client.get(
+            "/api/event/view/other/",
+            headers=auth_headers(booking_user(number)),
+        ),
+        "participate": lambda number: client.get(
+            "/api/event/view/participate/",
+            headers=auth_headers(booking_user(number)),
+        ),
+        "filter": lambda number: client.post("/api/event/filter/", json={
+            "city": CITIES[number % len(CITIES)],
+            "search": WORDS[number % len(WORDS)],
+        }),
+        "cities": lambda number: client.get("/api/event/cities/"),
+        "event-detail": lambda number: client.get(f"/api/event/{event_for(number)}/view/"),
+        # slot `event_id` is the first slot of every event in the seeded dataset
+        "register": lambda number: client.post(
+            f"/api/event/register/{event_for(number)}/",
+            json={
+                "event_date_time_id": event_for(number),
+                "custom_fields": [
+                    {"title": f"Поле {position + 1}", "value": "benchmark"} for position in range(args.custom_fields)
+                ],
+            },
+            headers=auth_headers(registered_user(number)),
+        ),
+        "members": lambda number: client.get(
+            f"/api/event/members/{event_for(number)}/",
+            headers=auth_headers(creators[event_for(number)]),
+        ),
+        "cancel-booking": lambda number: client.delete(
+            f"/api/event/cancel-booking/{event_for(number)}/",
+            headers=auth_headers(registered_user(number)),
+        ),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    add_dataset_arguments(parser)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("scenarios", nargs="*", help=f"any of {', '.join(SCENARIOS)}, all by default")
+    args = parser.parse_args()
+    scenarios = args.scenarios or SCENARIOS
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    # register and cancel-booking need one event per request to keep the
+    # (user, event) pairs they touch distinct
+    event_ids = open_event_ids(args.events, args.requests)
+    creators = await load_creators(event_ids)
+    spare_users = spare_user_ids(args.users, args.spare_users)
+
+    async with app_client(app) as client:
+        calls = build_calls(client, args, event_ids, creators, spare_users)
+        for name in scenarios:
+            result = await run_scenario(calls[name], args.requests, args.concurrency)
+            print_report(name, result)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
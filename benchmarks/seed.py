@@ -0,0 +1,223 @@
+"""Fill a local Postgres with a synthetic dataset for the benchmarks.
+
+Rows are generated deterministically, so the runners can derive ids, emails
+and passwords without reading them back. Every user's password is
+`benchmark1` and their email is `user{id}@benchmark.local`. The last
+`--spare-users` users get no bookings, the runners register them.
+
+    python -m benchmarks.seed --reset --events 100000 --slots 500000 --bookings 5000000
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import date, time as day_time, timedelta
+from src.auth.models import User
+from src.auth.utils import get_password_hash
+from src.events.models import Event, EventDateTime, CustomField, Booking, CustomValue, StatusEnum, FormatEnum
+from src.database import build_engine
+from src.config import DATABASE_URL_ASYNC
+
+
+PASSWORD = "benchmark1"
+CHUNK_SIZE = 50_000
+CITIES = ["Екатеринбург", "Москва", "Санкт-Петербург", "Казань", "Новосибирск", "Пермь", "Тюмень", "Челябинск"]
+WORDS = ["Форум", "Хакатон", "Митап", "Конференция", "Python", "Data", "Frontend", "Backend", "Design", "Product"]
+SEEDED_TABLES = [CustomValue, Booking, CustomField, EventDateTime, Event, User]
+
+
+def user_email(user_id: int) -> str:
+    return f"user{user_id}@benchmark.local"
+
+
+def slot_event_id(slot_id: int, events: int) -> int:
+    return (slot_id - 1) % events + 1
+
+
+def event_custom_field_ids(event_id: int, custom_fields: int) -> range:
+    first = (event_id - 1) * custom_fields + 1
+    return range(first, first + custom_fields)
+
+
+def slot_booking_users(slot_id: int, bookings_per_slot: int, users: int) -> list[int]:
+    # consecutive users starting at a slot-specific offset are distinct,
+    # which keeps (user_id, event_date_time_id) unique
+    offset = (slot_id * 7919) % users
+    return [(offset + position) % users + 1 for position in range(bookings_per_slot)]
+
+
+def generate_users(users: int, password_hash: str):
+    for user_id in range(1, users + 1):
+        yield {
+            "id": user_id,
+            "email": user_email(user_id),
+            "password": password_hash,
+            "first_name": f"Имя{user_id}",
+            "last_name": f"Фамилия{user_id}",
+            "city": CITIES[user_id % len(CITIES)],
+            "company_name": f"{WORDS[user_id % len(WORDS)]} Company {user_id % 1000}",
+        }
+
+
+def generate_events(events: int, users: int, rng: random.Random):
+    formats = list(FormatEnum)
+    for event_id in range(1, events + 1):
+        closed = event_id % 10 == 0
+        yield {
+            "id": event_id,
+            "name": f"{rng.choice(WORDS)} {rng.choice(WORDS)} #{event_id}",
+            "description": "Описание мероприятия " * 5,
+            "visit_cost": float(rng.choice([0, 500, 1000, 2500])),
+            "city": rng.choice(CITIES),
+            "address": f"ул. Ленина, {event_id % 200}",
+            "status": (StatusEnum.close if closed else StatusEnum.open).name,
+            "format": rng.choice(formats).name,
+            "unique_key": f"benchmark-{event_id}" if closed else None,
+            "creator_id": rng.randint(1, users),
+        }
+
+
+def generate_slots(slots: int, events: int, bookings_per_slot: int, rng: random.Random):
+    today = date.today()
+    for slot_id in range(1, slots + 1):
+        start_date = today + timedelta(days=rng.randint(-180, 365))
+        start_hour = rng.randint(8, 18)
+        yield {
+            "id": slot_id,
+            "start_date": start_date,
+            "end_date": start_date + timedelta(days=rng.choice([0, 0, 0, 1, 2])),
+            "start_time": day_time(start_hour),
+            "end_time": day_time(start_hour + 2),
+            # seats_number holds the seats left, as register_for_event keeps it
+            "seats_number": None if slot_id % 5 == 0 else bookings_per_slot * 2,
+            "event_id": slot_event_id(slot_id, events),
+        }
+
+
+def generate_custom_fields(events: int, custom_fields: int):
+    for event_id in range(1, events + 1):
+        for position, custom_field_id in enumerate(event_custom_field_ids(event_id, custom_fields)):
+            yield {"id": custom_field_id, "title": f"Поле {position + 1}", "event_id": event_id}
+
+
+def spare_user_ids(users: int, spare_users: int) -> range:
+    return range(users - spare_users + 1, users + 1)
+
+
+def generate_bookings(slots: int, bookings_per_slot: int, users: int):
+    booking_id = 0
+    for slot_id in range(1, slots + 1):
+        for user_id in slot_booking_users(slot_id, bookings_per_slot, users):
+            booking_id += 1
+            yield {"id": booking_id, "user_id": user_id, "event_date_time_id": slot_id, "expiration_date": None}
+
+
+def generate_custom_values(slots: int, events: int, bookings_per_slot: int, custom_fields: int):
+    booking_id = 0
+    custom_value_id = 0
+    for slot_id in range(1, slots + 1):
+        custom_field_ids = event_custom_field_ids(slot_event_id(slot_id, events), custom_fields)
+        for _ in range(bookings_per_slot):
+            booking_id += 1
+            for custom_field_id in custom_field_ids:
+                custom_value_id += 1
+                yield {"id": custom_value_id, "value": f"Значение {booking_id}",
+                       "custom_field_id": custom_field_id, "booking_id": booking_id}
+
+
+async def copy_rows(driver_connection, model, rows):
+    columns = None
+    chunk = []
+    total = 0
+
+    async def flush():
+        await driver_connection.copy_records_to_table(model.__tablename__, records=chunk, columns=columns)
+
+    for row in rows:
+        if columns is None:
+            columns = list(row.keys())
+        chunk.append(tuple(row[column] for column in columns))
+        if len(chunk) >= CHUNK_SIZE:
+            await flush()
+            total += len(chunk)
+            chunk = []
+
+    if chunk:
+        await flush()
+        total += len(chunk)
+
+    return total
+
+
+async def seed(args):
+    rng = random.Random(args.seed)
+    bookings_per_slot = max(args.bookings // args.slots, 0)
+    booking_users = args.users - args.spare_users
+    if bookings_per_slot > booking_users:
+        raise SystemExit("Every booking in a slot needs its own user, raise --users")
+
+    engine = build_engine(DATABASE_URL_ASYNC, "null")
+    async with engine.connect() as connection:
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+
+        if args.reset:
+            tables = ", ".join(f'"{model.__tablename__}"' for model in SEEDED_TABLES)
+            await connection.exec_driver_sql(f"TRUNCATE {tables} RESTART IDENTITY CASCADE")
+
+        steps = [
+            (User, generate_users(args.users, await get_password_hash(PASSWORD))),
+            (Event, generate_events(args.events, args.users, rng)),
+            (EventDateTime, generate_slots(args.slots, args.events, bookings_per_slot, rng)),
+            (CustomField, generate_custom_fields(args.events, args.custom_fields)),
+            (Booking, generate_bookings(args.slots, bookings_per_slot, booking_users)),
+            (CustomValue, generate_custom_values(args.slots, args.events, bookings_per_slot, args.custom_fields)),
+        ]
+        for model, rows in steps:
+            started = time.perf_counter()
+            total = await copy_rows(driver_connection, model, rows)
+            print(f"{model.__tablename__:>16}: {total:>10} rows in {time.perf_counter() - started:6.1f}s")
+
+        # the same backfill the time bounds migration runs
+        await connection.exec_driver_sql("""
+            UPDATE event
+            SET starts_at = bounds.starts_at, ends_at = bounds.ends_at
+            FROM (
+                SELECT event_id, min(start_date + start_time) AS starts_at, max(end_date + end_time) AS ends_at
+                FROM event_date_time
+                GROUP BY event_id
+            ) AS bounds
+            WHERE event.id = bounds.event_id
+        """)
+
+        for model in SEEDED_TABLES:
+            await connection.exec_driver_sql(
+                f"SELECT setval(pg_get_serial_sequence('\"{model.__tablename__}\"', 'id'), "
+                f"COALESCE((SELECT max(id) FROM \"{model.__tablename__}\"), 0) + 1, false)"
+            )
+
+        await connection.exec_driver_sql("ANALYZE")
+        await connection.commit()
+
+    await engine.dispose()
+
+
+def add_dataset_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--spare-users", type=int, default=1_000, help="users left without bookings")
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--slots", type=int, default=500_000)
+    parser.add_argument("--bookings", type=int, default=5_000_000)
+    parser.add_argument("--custom-fields", type=int, default=2, help="custom fields per event")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    add_dataset_arguments(parser)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="truncate the seeded tables first")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(seed(parse_args()))
@@ -15,6 +15,7 @@ sys.path.append(os.path.join(sys.path[0], 'src'))
 from src.auth.models import *
 from src.events.models import *
 from src.teams.models import *
+from src.idempotency.models import *
 from src.config import DATABASE_URL_ASYNC_ALEMBIC
 from src.database import Base
 
@@ -0,0 +1,27 @@
+"""updated at in event
+
+Revision ID: 2820c2d2b292
+Revises: bf1f673b178b
+Create Date: 2026-10-17 03:12:44.590271
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2820c2d2b292'
+down_revision: Union[str, None] = 'bf1f673b178b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # now() is stable, existing rows get it without a table rewrite
+    op.add_column('event', sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('event', 'updated_at')
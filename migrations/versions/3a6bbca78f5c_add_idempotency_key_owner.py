@@ -0,0 +1,29 @@
+"""add idempotency key owner
+
+Revision ID: 3a6bbca78f5c
+Revises: 800b0aaffb37
+Create Date: 2026-10-17 07:12:45.318902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3a6bbca78f5c'
+down_revision: Union[str, None] = '800b0aaffb37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # claims taken before the owner existed can't be extended, drop the unfinished ones
+    op.execute("DELETE FROM idempotency_key WHERE status_code IS NULL")
+    op.add_column('idempotency_key', sa.Column('owner', sa.String(length=32), server_default='', nullable=False))
+    op.alter_column('idempotency_key', 'owner', server_default=None)
+
+
+def downgrade() -> None:
+    op.drop_column('idempotency_key', 'owner')
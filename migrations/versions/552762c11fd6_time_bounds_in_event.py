@@ -0,0 +1,44 @@
+"""time bounds in event
+
+Revision ID: 552762c11fd6
+Revises: fd92a26fa45f
+Create Date: 2026-10-17 01:12:40.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '552762c11fd6'
+down_revision: Union[str, None] = 'fd92a26fa45f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('event', sa.Column('starts_at', sa.DateTime(), nullable=True))
+    op.add_column('event', sa.Column('ends_at', sa.DateTime(), nullable=True))
+    op.execute("""
+        UPDATE event
+        SET starts_at = bounds.starts_at, ends_at = bounds.ends_at
+        FROM (
+            SELECT event_id, min(start_date + start_time) AS starts_at, max(end_date + end_time) AS ends_at
+            FROM event_date_time
+            GROUP BY event_id
+        ) AS bounds
+        WHERE event.id = bounds.event_id
+    """)
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_event_starts_at_id', 'event', ['starts_at', 'id'], postgresql_concurrently=True)
+        op.create_index('ix_event_ends_at', 'event', ['ends_at'], postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_event_ends_at', table_name='event')
+    op.drop_index('ix_event_starts_at_id', table_name='event')
+    op.drop_column('event', 'ends_at')
+    op.drop_column('event', 'starts_at')
@@ -0,0 +1,35 @@
+"""cascade custom value on booking delete
+
+Revision ID: 7f65dee7e1e6
+Revises: e86e0daa10a8
+Create Date: 2026-10-17 04:20:37.461829
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7f65dee7e1e6'
+down_revision: Union[str, None] = 'e86e0daa10a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # bookings are removed with plain DELETEs now, their values go with them
+    op.drop_constraint('custom_value_booking_id_fkey', 'custom_value', type_='foreignkey')
+    op.create_foreign_key('custom_value_booking_id_fkey', 'custom_value', 'booking', ['booking_id'], ['id'],
+                          ondelete='CASCADE', postgresql_not_valid=True)
+    # the swap above commits first, so its ACCESS EXCLUSIVE lock is only held
+    # briefly. The scan runs on its own under SHARE UPDATE EXCLUSIVE, which
+    # lets reads and writes on custom_value carry on
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TABLE custom_value VALIDATE CONSTRAINT custom_value_booking_id_fkey")
+
+
+def downgrade() -> None:
+    op.drop_constraint('custom_value_booking_id_fkey', 'custom_value', type_='foreignkey')
+    op.create_foreign_key('custom_value_booking_id_fkey', 'custom_value', 'booking', ['booking_id'], ['id'])
@@ -0,0 +1,40 @@
+"""add waitlist entry
+
+Revision ID: 9d5810fcdd3f
+Revises: 7f65dee7e1e6
+Create Date: 2026-10-17 05:02:11.583604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d5810fcdd3f'
+down_revision: Union[str, None] = '7f65dee7e1e6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('waitlist_entry',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('event_date_time_id', sa.Integer(), nullable=False),
+    sa.Column('expiration_date', sa.DateTime(), nullable=True),
+    sa.Column('custom_values', postgresql.JSONB(astext_type=sa.Text()), server_default='{}', nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['event_date_time_id'], ['event_date_time.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'event_date_time_id', name='uq_waitlist_entry_user_id_event_date_time_id')
+    )
+    op.create_index('ix_waitlist_entry_event_date_time_id_id', 'waitlist_entry', ['event_date_time_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_waitlist_entry_event_date_time_id_id', table_name='waitlist_entry')
+    op.drop_table('waitlist_entry')
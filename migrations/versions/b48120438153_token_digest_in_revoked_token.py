@@ -0,0 +1,37 @@
+"""token digest in revoked token
+
+Revision ID: b48120438153
+Revises: 552762c11fd6
+Create Date: 2026-10-17 02:03:18.774512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b48120438153'
+down_revision: Union[str, None] = '552762c11fd6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('revoked_token', sa.Column('token_digest', sa.String(length=64), nullable=True))
+    # tokens revoked so far carry no jti, they are keyed by the digest of the whole token
+    op.execute("UPDATE revoked_token SET token_digest = encode(sha256(convert_to(token, 'UTF8')), 'hex')")
+    op.alter_column('revoked_token', 'token_digest', nullable=False)
+    op.create_unique_constraint('revoked_token_token_digest_key', 'revoked_token', ['token_digest'])
+    op.drop_column('revoked_token', 'token')
+
+
+def downgrade() -> None:
+    # the original tokens can't be recovered, the digests stand in for them
+    op.add_column('revoked_token', sa.Column('token', sa.String(), nullable=True))
+    op.execute("UPDATE revoked_token SET token = token_digest")
+    op.alter_column('revoked_token', 'token', nullable=False)
+    op.create_unique_constraint('revoked_token_token_key', 'revoked_token', ['token'])
+    op.drop_constraint('revoked_token_token_digest_key', 'revoked_token', type_='unique')
+    op.drop_column('revoked_token', 'token_digest')
@@ -0,0 +1,35 @@
+"""expires at index in revoked token
+
+Revision ID: bf1f673b178b
+Revises: b48120438153
+Create Date: 2026-10-17 02:41:07.318264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bf1f673b178b'
+down_revision: Union[str, None] = 'b48120438153'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # cleanup now selects by expires_at, nothing filters on revoked_at any more
+    with op.get_context().autocommit_block():
+        op.create_index('ix_revoked_token_expires_at', 'revoked_token', ['expires_at'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_revoked_token_revoked_at', table_name='revoked_token',
+                      postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_revoked_token_revoked_at', 'revoked_token', ['revoked_at'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_revoked_token_expires_at', table_name='revoked_token',
+                      postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,98 @@
+"""search vector in event
+
+Revision ID: e86e0daa10a8
+Revises: 2820c2d2b292
+Create Date: 2026-10-17 03:48:21.906115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e86e0daa10a8'
+down_revision: Union[str, None] = '2820c2d2b292'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column('event', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+
+    # names and organizers go in under both configs, russian stems the words
+    # and simple keeps proper names and latin terms intact
+    op.execute("""
+        CREATE FUNCTION event_search_vector(event_name text, event_description text, event_creator_id integer)
+        RETURNS tsvector AS $$
+            SELECT
+                setweight(to_tsvector('russian', coalesce(event_name, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(event_name, '')), 'A') ||
+                setweight(to_tsvector('russian', coalesce(creator.names, '')), 'B') ||
+                setweight(to_tsvector('simple', coalesce(creator.names, '')), 'B') ||
+                setweight(to_tsvector('russian', coalesce(event_description, '')), 'C')
+            FROM (SELECT 1) AS one
+            LEFT JOIN (
+                SELECT concat_ws(' ', first_name, last_name, patronymic, company_name) AS names
+                FROM "user"
+                WHERE id = event_creator_id
+            ) AS creator ON true
+        $$ LANGUAGE sql STABLE
+    """)
+    op.execute("""
+        CREATE FUNCTION event_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := event_search_vector(NEW.name, NEW.description, NEW.creator_id);
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER event_search_vector_update
+        BEFORE INSERT OR UPDATE OF name, description, creator_id ON event
+        FOR EACH ROW EXECUTE FUNCTION event_search_vector_update()
+    """)
+    op.execute("""
+        CREATE FUNCTION creator_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            UPDATE event
+            SET search_vector = event_search_vector(name, description, creator_id)
+            WHERE creator_id = NEW.id;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER creator_search_vector_update
+        AFTER UPDATE OF first_name, last_name, patronymic, company_name ON "user"
+        FOR EACH ROW
+        WHEN (
+            OLD.first_name IS DISTINCT FROM NEW.first_name
+            OR OLD.last_name IS DISTINCT FROM NEW.last_name
+            OR OLD.patronymic IS DISTINCT FROM NEW.patronymic
+            OR OLD.company_name IS DISTINCT FROM NEW.company_name
+        )
+        EXECUTE FUNCTION creator_search_vector_update()
+    """)
+    op.execute("UPDATE event SET search_vector = event_search_vector(name, description, creator_id)")
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_event_search_vector', 'event', ['search_vector'], postgresql_using='gin',
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_event_name_trgm', 'event', ['name'], postgresql_using='gin',
+                        postgresql_ops={'name': 'gin_trgm_ops'}, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_event_name_trgm', table_name='event', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_event_search_vector', table_name='event', postgresql_concurrently=True, if_exists=True)
+    op.execute('DROP TRIGGER creator_search_vector_update ON "user"')
+    op.execute("DROP FUNCTION creator_search_vector_update()")
+    op.execute("DROP TRIGGER event_search_vector_update ON event")
+    op.execute("DROP FUNCTION event_search_vector_update()")
+    op.execute("DROP FUNCTION event_search_vector(text, text, integer)")
+    op.drop_column('event', 'search_vector')
@@ -0,0 +1,81 @@
+"""indexes for lookup paths
+
+Revision ID: fd92a26fa45f
+Revises: d2fe9805c96e
+Create Date: 2026-10-17 00:37:15.412983
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fd92a26fa45f'
+down_revision: Union[str, None] = 'd2fe9805c96e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_booking_event_date_time_id', 'booking', ['event_date_time_id']),
+    ('ix_event_date_time_event_id', 'event_date_time', ['event_id']),
+    ('ix_custom_value_booking_id', 'custom_value', ['booking_id']),
+    ('ix_custom_value_custom_field_id', 'custom_value', ['custom_field_id']),
+    ('ix_custom_field_event_id', 'custom_field', ['event_id']),
+    ('ix_event_invite_event_id', 'event_invite', ['event_id']),
+    ('ix_user_team_team_id_user_id', 'user_team', ['team_id', 'user_id']),
+    ('ix_user_team_registration_link', 'user_team', ['registration_link']),
+    ('ix_team_registration_link', 'team', ['registration_link']),
+    ('ix_event_creator_id', 'event', ['creator_id']),
+    ('ix_event_status', 'event', ['status']),
+    ('ix_event_format', 'event', ['format']),
+    ('ix_revoked_token_revoked_at', 'revoked_token', ['revoked_at']),
+]
+
+
+def upgrade() -> None:
+    # duplicated bookings have to go before the unique constraint can be built,
+    # the seats they took are given back to their time slots
+    op.execute("""
+        CREATE TEMPORARY TABLE duplicated_booking ON COMMIT DROP AS
+        SELECT id, event_date_time_id FROM (
+            SELECT id, event_date_time_id,
+                   row_number() OVER (PARTITION BY user_id, event_date_time_id ORDER BY id) AS position
+            FROM booking
+            WHERE user_id IS NOT NULL AND event_date_time_id IS NOT NULL
+        ) AS numbered
+        WHERE position > 1
+    """)
+    op.execute("DELETE FROM custom_value WHERE booking_id IN (SELECT id FROM duplicated_booking)")
+    op.execute("DELETE FROM booking WHERE id IN (SELECT id FROM duplicated_booking)")
+    op.execute("""
+        UPDATE event_date_time
+        SET seats_number = seats_number + duplicated.count
+        FROM (
+            SELECT event_date_time_id, count(*) AS count
+            FROM duplicated_booking
+            GROUP BY event_date_time_id
+        ) AS duplicated
+        WHERE event_date_time.id = duplicated.event_date_time_id AND seats_number IS NOT NULL
+    """)
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index('uq_booking_user_id_event_date_time_id', 'booking', ['user_id', 'event_date_time_id'],
+                        unique=True, postgresql_concurrently=True, if_not_exists=True)
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+    op.execute(
+        "ALTER TABLE booking ADD CONSTRAINT uq_booking_user_id_event_date_time_id "
+        "UNIQUE USING INDEX uq_booking_user_id_event_date_time_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_booking_user_id_event_date_time_id', 'booking', type_='unique')
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
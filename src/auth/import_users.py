@@ -0,0 +1,29 @@
+import argparse
+import asyncio
+import json
+from concurrent.futures import ProcessPoolExecutor
+from src.auth.utils import import_users
+from src.database import async_session_maker
+from src.config import USER_IMPORT_WORKERS
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Create users from a CSV file or JSON lines")
+    parser.add_argument("path", help="a .csv file with a header row, anything else is read as JSON lines")
+    args = parser.parse_args()
+
+    with open(args.path, encoding="utf-8-sig") as file:
+        content = file.read()
+
+    # bcrypt for thousands of rows, the worker processes only live as long as the import
+    with ProcessPoolExecutor(max_workers=USER_IMPORT_WORKERS) as executor:
+        async with async_session_maker() as db:
+            report = await import_users(db, executor, content, args.path)
+
+    for error in report["invalid"]:
+        print(f"line {error['line']}: {error['error']}")
+    print(json.dumps({"created": report["created"], "skipped": report["skipped"], "invalid": len(report["invalid"])}))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Date
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Date, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from src.database import Base
@@ -30,8 +30,11 @@ class User(Base):
 
 class RevokedToken(Base):
     __tablename__ = "revoked_token"
+    __table_args__ = (
+        Index("ix_revoked_token_expires_at", "expires_at"),
+    )
 
     id = Column(Integer, primary_key=True)
-    token = Column(String, nullable=False, unique=True)
+    token_digest = Column(String(64), nullable=False, unique=True)
     revoked_at = Column(DateTime, default=datetime.utcnow)
     expires_at = Column(DateTime, nullable=False)
@@ -1,4 +1,5 @@
 from pydantic import BaseModel, EmailStr, field_validator
+from typing import Optional
 
 
 class UserRegisterSchema(BaseModel):
@@ -22,4 +23,13 @@ class UserLoginSchema(BaseModel):
 
 
 class ChangePasswordSchema(BaseModel):
-    password: str
\ No newline at end of file
+    password: str
+
+
+class UserImportSchema(UserRegisterSchema):
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    patronymic: Optional[str] = None
+    city: Optional[str] = None
+    phone_number: Optional[str] = None
+    company_name: Optional[str] = None
@@ -1,24 +1,172 @@
 from passlib.context import CryptContext
+from concurrent.futures import Executor, ThreadPoolExecutor
 from datetime import datetime, timedelta
+import asyncio
+import csv
+import io
+import json
+import time
 import jwt
+import hashlib
+from uuid import uuid4
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.auth.models import RevokedToken
-from sqlalchemy import delete, select, insert
+from src.auth.models import User, RevokedToken
+from src.auth.schemas import UserImportSchema
+from sqlalchemy import select
 from sqlalchemy.exc import NoResultFound
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from pydantic import ValidationError
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import HTTPException
-from src.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from src.database import async_session_maker, delete_in_batches
+from src.cache import TTLCache
+from src.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, PASSWORD_HASH_WORKERS, TOKEN_CLAIMS_CACHE_SIZE, TOKEN_CLAIMS_CACHE_TTL, USER_IMPORT_WORKERS, USER_IMPORT_CHUNK_SIZE, REVOKED_TOKENS_CLEANUP_BATCH_SIZE, REVOKED_TOKENS_CLEANUP_BUDGET
 
 
 oauth_scheme = OAuth2PasswordBearer(tokenUrl="login/")
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
 
+class RevokedTokens:
+    def __init__(self):
+        self.digests = set()
+        self.added_since_load = set()
+        self.loaded = False
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+    def replace(self, digests: set):
+        # keep revocations made while the table was being read
+        self.digests = digests | self.added_since_load
+        self.added_since_load = set()
+        self.loaded = True
+
+    def add(self, digest: str):
+        self.digests.add(digest)
+        self.added_since_load.add(digest)
+
+    def __contains__(self, digest: str):
+        return digest in self.digests
+
+
+# per-process copy of the revoked_token table, refreshed by a scheduled job
+# so revocations made by other workers reach this one as well
+revoked_tokens = RevokedTokens()
+
+# verified claims by token digest, entries never outlive the token's exp
+token_claims_cache = TTLCache(maxsize=TOKEN_CLAIMS_CACHE_SIZE, ttl=TOKEN_CLAIMS_CACHE_TTL)
+
+# bcrypt releases the GIL, so a few threads keep hashing off the event loop
+password_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+password_hashing = {"in_flight": 0}
+
+
+def get_password_hashing_stats():
+    in_flight = password_hashing["in_flight"]
+    return {
+        "workers": PASSWORD_HASH_WORKERS,
+        "in_flight": in_flight,
+        "queue_depth": max(in_flight - PASSWORD_HASH_WORKERS, 0),
+    }
+
+
+async def run_password_hashing(func, *args):
+    password_hashing["in_flight"] += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(password_hash_executor, func, *args)
+    finally:
+        password_hashing["in_flight"] -= 1
+
+
+async def verify_password(plain_password, hashed_password):
+    return await run_password_hashing(pwd_context.verify, plain_password, hashed_password)
+
+
+async def get_password_hash(password):
+    return await run_password_hashing(pwd_context.hash, password)
+
+
+def hash_passwords(passwords: list[str]) -> list[str]:
+    return [pwd_context.hash(password) for password in passwords]
+
+
+async def hash_passwords_in_processes(executor: Executor, passwords: list[str]) -> list[str]:
+    loop = asyncio.get_running_loop()
+    batch_size = -(-len(passwords) // USER_IMPORT_WORKERS)
+    batches = [passwords[start:start + batch_size] for start in range(0, len(passwords), batch_size)]
+    hashed_batches = await asyncio.gather(*[
+        loop.run_in_executor(executor, hash_passwords, batch) for batch in batches
+    ])
+    return [hashed_password for hashed_batch in hashed_batches for hashed_password in hashed_batch]
+
+
+def read_user_import_rows(content: str, filename: str):
+    if filename.lower().endswith(".csv"):
+        reader = csv.DictReader(io.StringIO(content))
+        for row in reader:
+            yield reader.line_num, {key: value for key, value in row.items() if value not in ("", None)}
+        return
+
+    for line_number, line in enumerate(content.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield line_number, exc
+
+
+def parse_user_import(content: str, filename: str):
+    users = {}
+    errors = []
+    duplicates = 0
+    for line_number, row in read_user_import_rows(content, filename):
+        if isinstance(row, Exception):
+            errors.append({"line": line_number, "error": str(row)})
+            continue
+        try:
+            user = UserImportSchema.model_validate(row)
+        except ValidationError as exc:
+            errors.append({"line": line_number, "error": "; ".join(error["msg"] for error in exc.errors())})
+            continue
+        if user.email in users:
+            duplicates += 1
+            continue
+        users[user.email] = user
+    return list(users.values()), duplicates, errors
+
+
+async def insert_imported_users(db: AsyncSession, executor: Executor, users: list[UserImportSchema]) -> int:
+    created = 0
+    for start in range(0, len(users), USER_IMPORT_CHUNK_SIZE):
+        chunk = users[start:start + USER_IMPORT_CHUNK_SIZE]
+
+        # skip hashing for accounts that already exist, bcrypt is the expensive part
+        result = await db.execute(select(User.email).where(User.email.in_([user.email for user in chunk])))
+        existing = set(result.scalars())
+        chunk = [user for user in chunk if user.email not in existing]
+        if not chunk:
+            continue
+
+        hashed_passwords = await hash_passwords_in_processes(executor, [user.password for user in chunk])
+        stmt = (
+            pg_insert(User)
+            .values([
+                {**user.model_dump(), "password": hashed_password}
+                for user, hashed_password in zip(chunk, hashed_passwords)
+            ])
+            .on_conflict_do_nothing(index_elements=[User.email])
+            .returning(User.id)
+        )
+        result = await db.execute(stmt)
+        created += len(result.all())
+        await db.commit()
+
+    return created
+
+
+async def import_users(db: AsyncSession, executor: Executor, content: str, filename: str) -> dict:
+    users, duplicates, errors = parse_user_import(content, filename)
+    created = await insert_imported_users(db, executor, users)
+    return {"created": created, "skipped": len(users) - created + duplicates, "invalid": errors}
 
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
@@ -27,18 +175,51 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=int(ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid4().hex})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-async def revoke_token(db: AsyncSession, token: str, expires_at: datetime):
-    stmt = insert(RevokedToken).values(token=token, expires_at=expires_at)
-    await db.execute(stmt)
+def get_revocation_digest(token: str, payload: dict | None = None) -> str:
+    # tokens issued before jti was added are keyed by the whole token
+    if payload is None:
+        try:
+            payload = jwt.decode(token, options={"verify_signature": False})
+        except jwt.PyJWTError:
+            payload = {}
+    return hashlib.sha256((payload.get("jti") or token).encode()).hexdigest()
+
+
+async def revoke_token(db: AsyncSession, token_digest: str, expires_at: datetime) -> bool:
+    # another worker may have revoked it since our set was last refreshed,
+    # False tells the caller the token was already revoked
+    stmt = (
+        pg_insert(RevokedToken)
+        .values(token_digest=token_digest, expires_at=expires_at)
+        .on_conflict_do_nothing(index_elements=[RevokedToken.token_digest])
+    )
+    result = await db.execute(stmt)
     await db.commit()
+    revoked_tokens.add(token_digest)
+    return result.rowcount > 0
+
+
+async def load_revoked_tokens(db: AsyncSession):
+    stmt = select(RevokedToken.token_digest).where(RevokedToken.expires_at > datetime.utcnow())
+    result = await db.execute(stmt)
+    revoked_tokens.replace(set(result.scalars()))
+
+
+async def refresh_revoked_tokens():
+    async with async_session_maker() as db:
+        await load_revoked_tokens(db)
+
 
+async def is_token_revoked(db: AsyncSession, token:str, payload: dict | None = None):
+    token_digest = get_revocation_digest(token, payload)
+    if revoked_tokens.loaded:
+        return token_digest in revoked_tokens
 
-async def is_token_revoked(db: AsyncSession, token:str):
-    stmt = select(RevokedToken).where(RevokedToken.token == token)
+    stmt = select(RevokedToken).where(RevokedToken.token_digest == token_digest)
     try:
         result = await db.execute(stmt)
         result.scalar_one()
@@ -47,22 +228,35 @@ async def is_token_revoked(db: AsyncSession, token:str):
         return False
 
 
-async def clean_revoked_tokens(db: AsyncSession):
-    threshold = datetime.utcnow() - timedelta(days=7)
-    stmt = delete(RevokedToken).where(RevokedToken.revoked_at < threshold)
-    await db.execute(stmt)
-    await db.commit()
+async def clean_revoked_tokens():
+    # an expired token fails signature checks anyway, so its row can go
+    async with async_session_maker() as db:
+        return await delete_in_batches(
+            db,
+            RevokedToken,
+            RevokedToken.expires_at < datetime.utcnow(),
+            REVOKED_TOKENS_CLEANUP_BATCH_SIZE,
+            REVOKED_TOKENS_CLEANUP_BUDGET,
+        )
 
 
-async def get_email_from_token(token: str, db: AsyncSession) -> str:
-    if await is_token_revoked(db, token):
-        raise HTTPException(status_code=401, detail="Could not validate credentials")
+def get_token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def decode_access_token(token: str) -> dict:
+    token_digest = get_token_digest(token)
+    payload = token_claims_cache.get(token_digest)
+    if payload is not None:
+        return payload
 
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
+        if payload.get("sub") is None:
             raise HTTPException(status_code=401, detail="Could not validate credentials")
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Could not validate credentials")
-    return email
\ No newline at end of file
+
+    expires_in = payload["exp"] - time.time() if "exp" in payload else None
+    token_claims_cache.set(token_digest, payload, ttl=expires_in)
+    return payload
\ No newline at end of file
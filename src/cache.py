@@ -0,0 +1,172 @@
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+from src.config import RESPONSE_CACHE_BACKEND, RESPONSE_CACHE_URL, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL
+import asyncio
+import time
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if self.maxsize <= 0 or ttl <= 0:
+            return
+
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[Any], bool]):
+        for key in [key for key, (_, value) in self._entries.items() if predicate(value)]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class MemoryBackend:
+    def __init__(self, maxsize: int, ttl: float):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.counters: dict[str, int] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        return self.entries.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        self.entries.set(key, value, ttl=ttl)
+
+    async def get_counter(self, key: str) -> int:
+        return self.counters.get(key, 0)
+
+    async def incr(self, key: str) -> int:
+        self.counters[key] = self.counters.get(key, 0) + 1
+        return self.counters[key]
+
+
+class RedisBackend:
+    def __init__(self, url: str):
+        # redis is only needed when this backend is configured
+        try:
+            from redis.asyncio import Redis
+        except ImportError:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis needs the redis package installed")
+        self.client = Redis.from_url(url)
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self.client.set(key, value, px=int(ttl * 1000))
+
+    async def get_counter(self, key: str) -> int:
+        return int(await self.client.get(key) or 0)
+
+    async def incr(self, key: str) -> int:
+        return await self.client.incr(key)
+
+
+def build_cache_backend():
+    if RESPONSE_CACHE_BACKEND == "redis":
+        return RedisBackend(RESPONSE_CACHE_URL)
+    return MemoryBackend(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+
+
+class ResponseCache:
+    # entries are keyed by a generation counter, bumping it drops every
+    # entry of the namespace at once and lets the old ones expire by TTL.
+    # For settle_time after a bump the cache reports itself recently
+    # invalidated, so callers can fill from a source that has the write
+    def __init__(self, backend, namespace: str, ttl: float, settle_time: float = 0):
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+        self.settle_time = settle_time
+        self.hits = 0
+        self.misses = 0
+        self._in_flight: dict[str, asyncio.Future] = {}
+
+    async def get_or_create(self, key: str, create: Callable[[], Awaitable[bytes]]) -> bytes:
+        generation = await self.backend.get_counter(f"{self.namespace}:generation")
+        full_key = f"{self.namespace}:{generation}:{key}"
+
+        while True:
+            value = await self.backend.get(full_key)
+            if value is not None:
+                self.hits += 1
+                return value
+
+            # concurrent misses for the same key wait for the first one
+            in_flight = self._in_flight.get(full_key)
+            if in_flight is None:
+                break
+            try:
+                value = await asyncio.shield(in_flight)
+            except asyncio.CancelledError:
+                # the first caller was cancelled, not this one, so take over
+                if in_flight.cancelled():
+                    continue
+                raise
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[full_key] = future
+        try:
+            value = await create()
+            await self.backend.set(full_key, value, self.ttl)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            # nobody may be waiting, keep the loop from reporting it
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            del self._in_flight[full_key]
+
+    async def invalidate(self):
+        # the marker goes first, a fill under the new generation must see it
+        if self.settle_time > 0:
+            await self.backend.set(f"{self.namespace}:invalidated", b"1", self.settle_time)
+        await self.backend.incr(f"{self.namespace}:generation")
+
+    async def recently_invalidated(self) -> bool:
+        if self.settle_time <= 0:
+            return False
+        return await self.backend.get(f"{self.namespace}:invalidated") is not None
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "in_flight": len(self._in_flight)}
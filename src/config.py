@@ -15,4 +15,46 @@ EMAIL_HOST = os.environ.get("EMAIL_HOST")
 EMAIL_PORT = os.environ.get("EMAIL_PORT")
 ACCESS_KEY = os.environ.get("ACCESS_KEY")
 SECRET_KEY = os.environ.get("SECRET_KEY")
-BUCKET_NAME = os.environ.get("BUCKET_NAME")
\ No newline at end of file
+BUCKET_NAME = os.environ.get("BUCKET_NAME")
+DATABASE_POOL_MODE = os.environ.get("DATABASE_POOL_MODE", "null" if os.environ.get("VERCEL") else "queue")
+DATABASE_POOL_SIZE = int(os.environ.get("DATABASE_POOL_SIZE", 10))
+DATABASE_MAX_OVERFLOW = int(os.environ.get("DATABASE_MAX_OVERFLOW", 10))
+DATABASE_POOL_PRE_PING = os.environ.get("DATABASE_POOL_PRE_PING", "true").lower() == "true"
+DATABASE_POOL_RECYCLE = int(os.environ.get("DATABASE_POOL_RECYCLE", 1800))
+DATABASE_POOL_WARMUP = int(os.environ.get("DATABASE_POOL_WARMUP", 0))
+
+DATABASE_URL_ASYNC_REPLICA = os.environ.get("DATABASE_URL_ASYNC_REPLICA")
+DATABASE_REPLICA_MAX_LAG = float(os.environ.get("DATABASE_REPLICA_MAX_LAG", 5))
+DATABASE_REPLICA_CHECK_INTERVAL = float(os.environ.get("DATABASE_REPLICA_CHECK_INTERVAL", 5))
+DATABASE_REPLICA_CHECK_TIMEOUT = float(os.environ.get("DATABASE_REPLICA_CHECK_TIMEOUT", 2))
+
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", 10000))
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", 60))
+TOKEN_CLAIMS_CACHE_SIZE = int(os.environ.get("TOKEN_CLAIMS_CACHE_SIZE", 10000))
+TOKEN_CLAIMS_CACHE_TTL = float(os.environ.get("TOKEN_CLAIMS_CACHE_TTL", 3600))
+
+REVOKED_TOKENS_REFRESH_INTERVAL = int(os.environ.get("REVOKED_TOKENS_REFRESH_INTERVAL", 30))
+REVOKED_TOKENS_CLEANUP_INTERVAL = int(os.environ.get("REVOKED_TOKENS_CLEANUP_INTERVAL", 600))
+REVOKED_TOKENS_CLEANUP_BATCH_SIZE = int(os.environ.get("REVOKED_TOKENS_CLEANUP_BATCH_SIZE", 1000))
+REVOKED_TOKENS_CLEANUP_BUDGET = float(os.environ.get("REVOKED_TOKENS_CLEANUP_BUDGET", 5))
+
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 4))
+
+USER_IMPORT_WORKERS = int(os.environ.get("USER_IMPORT_WORKERS", os.cpu_count() or 1))
+USER_IMPORT_CHUNK_SIZE = int(os.environ.get("USER_IMPORT_CHUNK_SIZE", 1000))
+
+RESPONSE_CACHE_BACKEND = os.environ.get("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_URL = os.environ.get("RESPONSE_CACHE_URL")
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 1000))
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", 30))
+
+EXPIRED_BOOKINGS_SWEEP_INTERVAL = int(os.environ.get("EXPIRED_BOOKINGS_SWEEP_INTERVAL", 3600))
+EXPIRED_BOOKINGS_SWEEP_BATCH_SIZE = int(os.environ.get("EXPIRED_BOOKINGS_SWEEP_BATCH_SIZE", 1000))
+EXPIRED_BOOKINGS_SWEEP_BUDGET = float(os.environ.get("EXPIRED_BOOKINGS_SWEEP_BUDGET", 30))
+
+IDEMPOTENCY_KEY_TTL = int(os.environ.get("IDEMPOTENCY_KEY_TTL", 86400))
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.environ.get("IDEMPOTENCY_LOCK_TIMEOUT", 60))
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.environ.get("IDEMPOTENCY_WAIT_TIMEOUT", 30))
+IDEMPOTENCY_CLEANUP_INTERVAL = int(os.environ.get("IDEMPOTENCY_CLEANUP_INTERVAL", 3600))
+IDEMPOTENCY_CLEANUP_BATCH_SIZE = int(os.environ.get("IDEMPOTENCY_CLEANUP_BATCH_SIZE", 1000))
+IDEMPOTENCY_CLEANUP_BUDGET = float(os.environ.get("IDEMPOTENCY_CLEANUP_BUDGET", 5))
@@ -1,15 +1,146 @@
-from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from typing import AsyncGenerator, Awaitable, Callable
+import asyncio
+import logging
+import time
+from sqlalchemy import text, select, delete
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.pool import NullPool
-from src.config import DATABASE_URL_ASYNC
+from src.config import (DATABASE_URL_ASYNC, DATABASE_POOL_MODE, DATABASE_POOL_SIZE, DATABASE_MAX_OVERFLOW,
+                        DATABASE_POOL_PRE_PING, DATABASE_POOL_RECYCLE, DATABASE_POOL_WARMUP,
+                        DATABASE_URL_ASYNC_REPLICA, DATABASE_REPLICA_MAX_LAG, DATABASE_REPLICA_CHECK_INTERVAL,
+                        DATABASE_REPLICA_CHECK_TIMEOUT)
 
 
+logger = logging.getLogger("src.database")
+
 Base = declarative_base()
 
-engine = create_async_engine(DATABASE_URL_ASYNC, poolclass=NullPool)
+
+def build_engine(url: str, pool_mode: str = DATABASE_POOL_MODE) -> AsyncEngine:
+    # NullPool stays for serverless deployments (vercel), where a process
+    # doesn't outlive the request and pooled connections would leak.
+    if pool_mode == "null":
+        return create_async_engine(url, poolclass=NullPool)
+
+    return create_async_engine(
+        url,
+        pool_size=DATABASE_POOL_SIZE,
+        max_overflow=DATABASE_MAX_OVERFLOW,
+        pool_pre_ping=DATABASE_POOL_PRE_PING,
+        pool_recycle=DATABASE_POOL_RECYCLE,
+    )
+
+
+async def warm_up_pool(engine: AsyncEngine, connections: int = DATABASE_POOL_WARMUP):
+    if isinstance(engine.pool, NullPool) or connections <= 0:
+        return
+
+    connections = min(connections, DATABASE_POOL_SIZE)
+    # open them concurrently and keep all checked out until every one is up,
+    # otherwise the pool would hand the same connection back each time
+    opened = await asyncio.gather(*(engine.connect().start() for _ in range(connections)))
+    for connection in opened:
+        await connection.close()
+
+
+engine = build_engine(DATABASE_URL_ASYNC)
 async_session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
         yield session
+
+
+async def delete_in_batches(
+    db: AsyncSession,
+    model,
+    condition,
+    batch_size: int,
+    budget: float,
+    delete_batch: Callable[[object], Awaitable[int]] | None = None,
+) -> int:
+    # short batches keep locks brief, the budget bounds a single run and
+    # whatever is left is picked up by the next one. delete_batch gets the
+    # SELECT of the batch ids and returns how many rows it removed
+    started_at = time.monotonic()
+    deleted = 0
+    while time.monotonic() - started_at < budget:
+        batch_ids = (
+            select(model.id)
+            .where(condition)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        if delete_batch is None:
+            batch_deleted = (await db.execute(delete(model).where(model.id.in_(batch_ids)))).rowcount
+        else:
+            batch_deleted = await delete_batch(batch_ids)
+        await db.commit()
+        deleted += batch_deleted
+        if batch_deleted < batch_size:
+            break
+    return deleted
+
+
+replica_engine = build_engine(DATABASE_URL_ASYNC_REPLICA) if DATABASE_URL_ASYNC_REPLICA else None
+replica_session_maker = (
+    async_sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False)
+    if replica_engine else None
+)
+
+# 0 when the server isn't a standby or has replayed everything it received,
+# so an idle primary doesn't look like a lagging replica
+REPLICA_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+replica_state = {"checked_at": None, "usable": False, "check": None}
+
+
+async def check_replica_lag() -> bool:
+    async with replica_engine.connect() as connection:
+        lag = await connection.scalar(REPLICA_LAG_QUERY)
+    return float(lag) <= DATABASE_REPLICA_MAX_LAG
+
+
+async def refresh_replica_state():
+    # an unreachable replica can keep connect() hanging far longer than the
+    # check interval, the timeout marks it unusable instead
+    try:
+        replica_state["usable"] = await asyncio.wait_for(check_replica_lag(), timeout=DATABASE_REPLICA_CHECK_TIMEOUT)
+    except (SQLAlchemyError, OSError, asyncio.TimeoutError) as e:
+        logger.warning(f"Replica is unavailable: {e!r}")
+        replica_state["usable"] = False
+    finally:
+        replica_state["checked_at"] = time.monotonic()
+        replica_state["check"] = None
+
+
+async def is_replica_usable() -> bool:
+    # requests only read the flag, a stale one is refreshed in the background
+    # and the primary serves reads until the first check says otherwise
+    if replica_engine is None:
+        return False
+
+    checked_at = replica_state["checked_at"]
+    stale = checked_at is None or time.monotonic() - checked_at >= DATABASE_REPLICA_CHECK_INTERVAL
+    if stale and replica_state["check"] is None:
+        replica_state["check"] = asyncio.create_task(refresh_replica_state())
+
+    return replica_state["usable"]
+
+
+def is_replica_session(session: AsyncSession) -> bool:
+    return replica_engine is not None and session.bind is replica_engine
+
+
+async def get_async_read_session() -> AsyncGenerator[AsyncSession, None]:
+    session_maker = replica_session_maker if await is_replica_usable() else async_session_maker
+    async with session_maker() as session:
+        yield session
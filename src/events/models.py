@@ -1,5 +1,6 @@
-from sqlalchemy import Column, String, Integer, Enum, Float, Date, Time, ForeignKey, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Integer, Enum, Float, Date, Time, ForeignKey, DateTime, Index, UniqueConstraint, case, and_, or_, func
+from sqlalchemy.orm import relationship, deferred
+from sqlalchemy.dialects.postgresql import TSVECTOR, JSONB
 from sqlalchemy.ext.hybrid import hybrid_property
 from src.database import Base
 from datetime import datetime
@@ -37,8 +38,30 @@ class FormatEnum(enum.Enum):
         return self.value
 
 
+def get_event_state(starts_at: datetime | None, ends_at: datetime | None) -> str:
+    now = datetime.now()
+
+    if starts_at and starts_at > now:
+        return "Открыто"
+    elif starts_at and ends_at and starts_at <= now <= ends_at:
+        return "Идёт"
+    elif ends_at and ends_at < now:
+        return "Завершено"
+
+    return "Нет дат"
+
+
 class Event(Base):
     __tablename__ = "event"
+    __table_args__ = (
+        Index("ix_event_creator_id", "creator_id"),
+        Index("ix_event_status", "status"),
+        Index("ix_event_format", "format"),
+        Index("ix_event_starts_at_id", "starts_at", "id"),
+        Index("ix_event_ends_at", "ends_at"),
+        Index("ix_event_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_event_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
 
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
@@ -53,6 +76,11 @@ class Event(Base):
     online_link = Column(String, nullable=True)
     unique_key = Column(String, unique=True, nullable=True)
     creator_id = Column(Integer, ForeignKey("user.id"), nullable=True)
+    starts_at = Column(DateTime, nullable=True)
+    ends_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, server_default=func.now())
+    # filled by the event_search_vector_update trigger from the name, description and creator
+    search_vector = deferred(Column(TSVECTOR, nullable=True))
 
     custom_fields = relationship("CustomField", back_populates="event_custom_field", cascade="all, delete")
     event_dates_times = relationship("EventDateTime", back_populates="event_initiator", cascade="all, delete")
@@ -62,39 +90,33 @@ class Event(Base):
 
     @hybrid_property
     def state(self):
-        now = datetime.now()
-
-        if not self.event_dates_times:
-            return "Нет дат"
+        return get_event_state(self.starts_at, self.ends_at)
 
-        earliest_time = min(
-            (
-                datetime.combine(event.start_date, event.start_time)
-                for event in self.event_dates_times
-            ),
-            default=None,
-        )
+    @state.expression
+    def state(cls):
+        now = datetime.now()
 
-        latest_time = max(
-            (
-                datetime.combine(event.end_date, event.end_time)
-                for event in self.event_dates_times
-            ),
-            default=None,
+        return case(
+            (cls.starts_at > now, "Открыто"),
+            (and_(cls.starts_at <= now, cls.ends_at >= now), "Идёт"),
+            (cls.ends_at < now, "Завершено"),
+            else_="Нет дат",
         )
 
-        if earliest_time and earliest_time > now:
-            return "Открыто"
-        elif earliest_time and latest_time and earliest_time <= now <= latest_time:
-            return "Идёт"
-        elif latest_time and latest_time < now:
-            return "Завершено"
+    @hybrid_property
+    def is_not_finished(self):
+        return self.ends_at is None or self.ends_at >= datetime.now()
 
-        return "Нет дат"
+    @is_not_finished.expression
+    def is_not_finished(cls):
+        return or_(cls.ends_at == None, cls.ends_at >= datetime.now())
 
 
 class EventDateTime(Base):
     __tablename__ = "event_date_time"
+    __table_args__ = (
+        Index("ix_event_date_time_event_id", "event_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     start_date = Column(Date, nullable=False)
@@ -110,6 +132,9 @@ class EventDateTime(Base):
 
 class CustomField(Base):
     __tablename__ = "custom_field"
+    __table_args__ = (
+        Index("ix_custom_field_event_id", "event_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     title = Column(String, nullable=False)
@@ -132,6 +157,9 @@ class EventFile(Base):
 
 class EventInvite(Base):
     __tablename__ = "event_invite"
+    __table_args__ = (
+        Index("ix_event_invite_event_id", "event_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     email = Column(String, nullable=False)
@@ -142,25 +170,50 @@ class EventInvite(Base):
 
 class Booking(Base):
     __tablename__ = "booking"
+    __table_args__ = (
+        UniqueConstraint("user_id", "event_date_time_id", name="uq_booking_user_id_event_date_time_id"),
+        Index("ix_booking_event_date_time_id", "event_date_time_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("user.id"))
     event_date_time_id = Column(Integer, ForeignKey("event_date_time.id", ondelete="CASCADE"))
     expiration_date = Column(DateTime, nullable=True)
 
-    booking_values = relationship("CustomValue", back_populates="booking_custom_values", cascade="all, delete")
+    booking_values = relationship("CustomValue", back_populates="booking_custom_values", cascade="all, delete", passive_deletes=True)
     user_bookings = relationship("User", back_populates="bookings")
     booking_date_time = relationship("EventDateTime", back_populates="date_time_bookings")
 
 
 class CustomValue(Base):
     __tablename__ = "custom_value"
+    __table_args__ = (
+        Index("ix_custom_value_booking_id", "booking_id"),
+        Index("ix_custom_value_custom_field_id", "custom_field_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     value = Column(String, nullable=False)
 
     custom_field_id = Column(Integer, ForeignKey("custom_field.id"))
-    booking_id = Column(Integer, ForeignKey("booking.id"))
+    booking_id = Column(Integer, ForeignKey("booking.id", ondelete="CASCADE"))
 
     custom_fields_for_values = relationship("CustomField", back_populates="custom_values")
     booking_custom_values = relationship("Booking", back_populates="booking_values")
+
+
+class WaitlistEntry(Base):
+    __tablename__ = "waitlist_entry"
+    __table_args__ = (
+        UniqueConstraint("user_id", "event_date_time_id", name="uq_waitlist_entry_user_id_event_date_time_id"),
+        # ids grow with the join order, so the queue of a slot is read in index order
+        Index("ix_waitlist_entry_event_date_time_id_id", "event_date_time_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    event_date_time_id = Column(Integer, ForeignKey("event_date_time.id", ondelete="CASCADE"), nullable=False)
+    expiration_date = Column(DateTime, nullable=True)
+    # custom field id to value, copied into custom_value on promotion
+    custom_values = Column(JSONB, nullable=False, server_default="{}")
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
@@ -1,21 +1,20 @@
-from fastapi import APIRouter, Depends, UploadFile, HTTPException, Body
+from fastapi import APIRouter, Depends, UploadFile, HTTPException, Body, Query, Request, Response, BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, distinct, and_, func, exists
+from sqlalchemy import select, update, delete, distinct, and_, func
 from sqlalchemy.orm import joinedload
-from sqlalchemy.types import TIMESTAMP
-from src.events.schemas import EventCreateSchema, EventCreateResponseSchema, EventInviteSchema, EventRegistrationSchema, EventInfoSchema, EventSchema, FilterSchema, MessageSchema, ChangeOnlineLinkSchema, EventUpdateSchema, TeamInvitationSchema, EventDateTimeMembersSchema, FilledCustomFieldsResponseSchema
-from src.events.models import Event, Booking, EventDateTime, EventInvite, StatusEnum, CustomValue, CustomField
-from src.events.utils import upload_photo, upload_files_for_event, add_custom_fields_to_event, add_dates_and_times_to_event, send_email, register_for_event, get_events, get_event_info, get_event, collect_filters, send_message_to_email, update_custom_fields_for_event, update_dates_and_times_for_event
-from src.auth.utils import oauth_scheme
+from src.events.schemas import EventCreateSchema, EventCreateResponseSchema, EventInviteSchema, EventRegistrationSchema, EventSchema, FilterSchema, MessageSchema, ChangeOnlineLinkSchema, EventUpdateSchema, TeamInvitationSchema, EventDateTimeMembersSchema, FilledCustomFieldsResponseSchema, EventPageSchema, WaitlistPositionSchema
+from src.events.models import Event, Booking, EventDateTime, EventInvite, StatusEnum, CustomValue, CustomField, WaitlistEntry
+from src.events.utils import upload_photo, upload_files_for_event, add_custom_fields_to_event, add_dates_and_times_to_event, send_email, register_for_event, get_registration_event, join_waitlist, select_waitlist_positions, promote_waitlisted, notify_promoted_bookings, get_event, collect_filters, send_message_to_email, update_custom_fields_for_event, update_dates_and_times_for_event, refresh_event_time_bounds, paginate_events, get_events_page, is_booked_by_user, select_event_listings, get_event_listings, event_listing_cache, get_cached_response, get_cached_events_page, normalize_filters, get_filters_cache_key, get_event_etag, etag_matches, get_search_rank
 from src.auth.models import User
-from src.user_profile.utils import get_user_profile_by_email
-from src.teams.models import Team, UserTeam
-from src.database import get_async_session
+from src.user_profile.utils import get_current_user
+from src.teams.models import UserTeam
+from src.database import get_async_session, get_async_read_session
 from typing import List, Optional
 from uuid import uuid4
+from datetime import datetime
+import json
 from sqlalchemy.orm import selectinload
 from src.s3 import S3Client, get_s3_client
-from datetime import datetime
 
 
 router = APIRouter(
@@ -25,14 +24,12 @@ router = APIRouter(
 @router.post("/create/", response_model=EventCreateResponseSchema)
 async def create_event(
     event: EventCreateSchema = Body(...),
-    token: str = Depends(oauth_scheme),
+    user: User = Depends(get_current_user),
     s3_client: S3Client = Depends(get_s3_client),
     db: AsyncSession = Depends(get_async_session),
     photo: Optional[UploadFile] = UploadFile(None),
     schedule: Optional[UploadFile] = UploadFile(None)
 ):
-    user = await get_user_profile_by_email(token, db)
-
     photo_path = None
     if photo.filename:
         photo_path = await upload_photo(photo, photo.filename, s3_client)
@@ -69,6 +66,7 @@ async def create_event(
     db.add(new_event)
     await db.commit()
     await db.refresh(new_event)
+    await event_listing_cache.invalidate()
 
     return {
         "msg": "Event created",
@@ -81,15 +79,14 @@ async def create_event(
 @router.put("/update/{event_id}/")
 async def update_event(
     event_id: int,
+    background_tasks: BackgroundTasks,
     updated_event: EventUpdateSchema = Body(...),
-    token: str = Depends(oauth_scheme),
+    user: User = Depends(get_current_user),
     s3_client: S3Client = Depends(get_s3_client),
     db: AsyncSession = Depends(get_async_session),
     photo: Optional[UploadFile] = UploadFile(None),
     schedule: Optional[UploadFile] = UploadFile(None)
 ):
-    user = await get_user_profile_by_email(token, db)
-
     event = await db.get(Event, event_id, options=[joinedload(Event.event_dates_times), joinedload(Event.custom_fields), joinedload(Event.creator)])
     if not event:
         return {"msg": "Event not found"}
@@ -134,7 +131,16 @@ async def update_event(
     if updated_event.custom_fields:
         await update_custom_fields_for_event(event, updated_event.custom_fields, db)
 
+    await refresh_event_time_bounds(event, db)
+    # slot edits alone don't touch the event row
+    event.updated_at = datetime.utcnow()
+
+    # seats added to a slot go to its waitlist first
+    promoted = await promote_waitlisted([dt.id for dt in event.event_dates_times if dt.id], db)
+
     await db.commit()
+    await event_listing_cache.invalidate()
+    background_tasks.add_task(notify_promoted_bookings, promoted)
 
     stmt = (
         select(User)
@@ -157,9 +163,8 @@ async def update_event(
 @router.get("/get-filled-custom-fields/{event_id}/", response_model=FilledCustomFieldsResponseSchema)
 async def get_filled_custom_fields(
     event_id: int,
-    token: str = Depends(oauth_scheme),
+    user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session)):
-    user = await get_user_profile_by_email(token, db)
     stmt = select(Event).where(Event.id == event_id).options(selectinload(Event.custom_fields)
                                                              .selectinload(CustomField.custom_values))
     result = await db.execute(stmt)
@@ -183,10 +188,9 @@ async def get_filled_custom_fields(
 @router.delete("/cancel/{event_id}/")
 async def cancel_event(
     event_id: int,
-    token: str = Depends(oauth_scheme),
+    user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session)
 ):
-    user = await get_user_profile_by_email(token, db)
     stmt = select(Event).where(Event.id == event_id).options(selectinload(Event.custom_fields),
                                                              selectinload(Event.event_dates_times),
                                                              selectinload(Event.files))
@@ -215,6 +219,7 @@ async def cancel_event(
 
     await db.delete(event)
     await db.commit()
+    await event_listing_cache.invalidate()
 
     return {"msg": "Event was deleted"}
 
@@ -224,11 +229,9 @@ async def cancel_event(
 async def change_online_link_for_event(
     event_id: int,
     online_link: ChangeOnlineLinkSchema,
-    token: str = Depends(oauth_scheme),
+    user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session)
 ):
-    user = await get_user_profile_by_email(token, db)
-
     stmt = select(Event).where(Event.id == event_id)
     result = await db.execute(stmt)
     event = result.scalar_one_or_none()
@@ -271,8 +274,7 @@ async def upload_event_files(
 
 
 @router.post("/invite/")
-async def invite_users(users_invited_to_event: EventInviteSchema, token: str = Depends(oauth_scheme), db: AsyncSession = Depends(get_async_session)):
-    user = await get_user_profile_by_email(token, db)
+async def invite_users(users_invited_to_event: EventInviteSchema, user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_session)):
     event_id = users_invited_to_event.event_id
 
     stmt = select(Event).where(Event.id == event_id).options(selectinload(Event.creator))
@@ -308,108 +310,101 @@ async def invite_users(users_invited_to_event: EventInviteSchema, token: str = D
     }
 
 
-@router.get("/view/", response_model=List[EventInfoSchema])
-async def view_all_events(s3_client: S3Client = Depends(get_s3_client), db: AsyncSession = Depends(get_async_session)):
-    stmt = select(Event).where(Event.status!=StatusEnum.close).options(selectinload(Event.event_dates_times))
-    result = await db.execute(stmt)
-    events = result.scalars().all()
+@router.get("/view/", response_model=EventPageSchema)
+async def view_all_events(limit: int = Query(20, ge=1, le=100),
+                          cursor: Optional[str] = None,
+                          s3_client: S3Client = Depends(get_s3_client),
+                          db: AsyncSession = Depends(get_async_read_session)):
+    stmt = select_event_listings().where(Event.status!=StatusEnum.close, Event.is_not_finished)
 
-    filtered_events = [event for event in events if event.state != "Завершено"]
-    
-    event_list = get_events(filtered_events, s3_client)
-    return event_list
+    return await get_cached_events_page("view", stmt, limit, cursor, s3_client, db)
 
 
-@router.get("/view/my/", response_model=List[EventInfoSchema])
-async def view_all_my_events(s3_client: S3Client = Depends(get_s3_client),
-                          token: str = Depends(oauth_scheme),
+@router.get("/view/my/", response_model=EventPageSchema)
+async def view_all_my_events(limit: int = Query(20, ge=1, le=100),
+                          cursor: Optional[str] = None,
+                          s3_client: S3Client = Depends(get_s3_client),
+                          user: User = Depends(get_current_user),
                           db: AsyncSession = Depends(get_async_session)):
-    user = await get_user_profile_by_email(token, db)
-    stmt = select(Event).where(Event.creator_id == user.id).distinct().options(selectinload(Event.event_dates_times))
-    result = await db.execute(stmt)
-    events = result.scalars().all()
+    stmt = select_event_listings().where(Event.creator_id == user.id)
+    stmt = paginate_events(stmt, limit, cursor)
+    events = await get_event_listings(stmt, db)
     
-    event_list = get_events(events, s3_client)
-    return event_list
+    return get_events_page(events, limit, s3_client)
 
 
-@router.get("/view/participate/", response_model=List[EventInfoSchema])
-async def view_participate_events(s3_client: S3Client = Depends(get_s3_client),
-                          token: str = Depends(oauth_scheme),
+@router.get("/view/participate/", response_model=EventPageSchema)
+async def view_participate_events(limit: int = Query(20, ge=1, le=100),
+                          cursor: Optional[str] = None,
+                          s3_client: S3Client = Depends(get_s3_client),
+                          user: User = Depends(get_current_user),
                           db: AsyncSession = Depends(get_async_session)):
-    user = await get_user_profile_by_email(token, db)
-    stmt = (
-        select(Event)
-        .join(EventDateTime, EventDateTime.event_id == Event.id)
-        .join(Booking, Booking.event_date_time_id == EventDateTime.id)
-        .where(Booking.user_id == user.id, Event.creator_id != user.id)
-        .options(
-            selectinload(Event.event_dates_times).selectinload(EventDateTime.event_initiator)
-        )
-    )
-    result = await db.execute(stmt)
-    events = result.scalars().all()
+    stmt = select_event_listings().where(is_booked_by_user(user.id), Event.creator_id != user.id)
+    stmt = paginate_events(stmt, limit, cursor)
+    events = await get_event_listings(stmt, db)
     
-    event_list = get_events(events, s3_client)
-    return event_list
+    return get_events_page(events, limit, s3_client)
 
 
-@router.get("/view/other/", response_model=List[EventInfoSchema])
-async def view_participate_events(s3_client: S3Client = Depends(get_s3_client),
-                          token: str = Depends(oauth_scheme),
+@router.get("/view/other/", response_model=EventPageSchema)
+async def view_other_events(limit: int = Query(20, ge=1, le=100),
+                          cursor: Optional[str] = None,
+                          s3_client: S3Client = Depends(get_s3_client),
+                          user: User = Depends(get_current_user),
                           db: AsyncSession = Depends(get_async_session)):
-    user = await get_user_profile_by_email(token, db)
-    stmt = (
-        select(Event)
-        .join(EventDateTime, EventDateTime.event_id != Event.id)
-        .join(Booking, Booking.event_date_time_id != EventDateTime.id)
-        .where(Event.status!=StatusEnum.close, Booking.user_id != user.id, Event.creator_id != user.id)
-        .distinct()
-        .order_by(Event.id)
-        .options(
-            selectinload(Event.event_dates_times).selectinload(EventDateTime.event_initiator)
-        )
-    )
-    result = await db.execute(stmt)
-    events = result.scalars().all()
-
-    filtered_events = [event for event in events if event.state != "Завершено"]
+    # events the user neither created nor booked
+    stmt = select_event_listings().where(Event.status!=StatusEnum.close, Event.is_not_finished,
+                                         Event.creator_id != user.id, ~is_booked_by_user(user.id))
+    stmt = paginate_events(stmt, limit, cursor)
+    events = await get_event_listings(stmt, db)
     
-    event_list = get_events(filtered_events, s3_client)
-    return event_list
+    return get_events_page(events, limit, s3_client)
 
 
 
-@router.get("/view/{format}/", response_model=List[EventInfoSchema])
+@router.get("/view/{format}/", response_model=EventPageSchema)
 async def view_all_events(format: str,
+                          limit: int = Query(20, ge=1, le=100),
+                          cursor: Optional[str] = None,
                           s3_client: S3Client = Depends(get_s3_client),
-                          db: AsyncSession = Depends(get_async_session)):
-    stmt = select(Event).where(Event.format == format, Event.status!=StatusEnum.close).options(selectinload(Event.event_dates_times))
-    result = await db.execute(stmt)
-    events = result.scalars().all()
+                          db: AsyncSession = Depends(get_async_read_session)):
+    stmt = select_event_listings().where(Event.format == format, Event.status!=StatusEnum.close, Event.is_not_finished)
 
-    filtered_events = [event for event in events if event.state != "Завершено"]
-    
-    event_list = get_events(filtered_events, s3_client)
-    
-    return event_list
+    return await get_cached_events_page(f"view:{format}", stmt, limit, cursor, s3_client, db)
 
 
 @router.get("/{identifier}/view/", response_model=EventSchema)
 async def view_events(identifier: int | str,
+                      request: Request,
+                      response: Response,
                       s3_client: S3Client = Depends(get_s3_client),
-                      db: AsyncSession = Depends(get_async_session)):
+                      db: AsyncSession = Depends(get_async_read_session)):
     if identifier.isdigit():
-        stmt = select(Event).where(Event.id == int(identifier)).options(selectinload(Event.event_dates_times).selectinload(EventDateTime.date_time_bookings),
-                                                             selectinload(Event.creator), selectinload(Event.invites))
-        result = await db.execute(stmt)
-        event = result.scalar_one_or_none()
+        condition = Event.id == int(identifier)
     else:
-        stmt = select(Event).where(Event.unique_key == identifier).options(selectinload(Event.event_dates_times).selectinload(EventDateTime.date_time_bookings),
-                                                             selectinload(Event.creator), selectinload(Event.invites))
+        condition = Event.unique_key == identifier
+
+    etag, status = await get_event_etag(condition, db)
+    if etag is None:
+        raise HTTPException(detail="Event doesn't exist", status_code=404)
+
+    # clients keep the page and revalidate it on every poll, closed events
+    # are reachable by secret link only and stay out of shared caches
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache" if status == StatusEnum.close else "public, no-cache",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    stmt = select(Event).where(condition).options(selectinload(Event.event_dates_times).selectinload(EventDateTime.date_time_bookings),
+                                                  selectinload(Event.creator))
     result = await db.execute(stmt)
     event = result.scalar_one_or_none()
-    
+    if event is None:
+        raise HTTPException(detail="Event doesn't exist", status_code=404)
+
+    response.headers.update(headers)
     event_info = get_event(event, s3_client)
     
     return event_info
@@ -418,10 +413,9 @@ async def view_events(identifier: int | str,
 @router.get("/register/{identifier}/")
 async def get_register_by_event_id_info(
     identifier: int | str,
-    token: str = Depends(oauth_scheme),
+    user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session)
 ):
-    user = await get_user_profile_by_email(token, db)
     if identifier.isdigit():
         stmt = select(Event).where(Event.id == int(identifier)).options(
             selectinload(Event.custom_fields)
@@ -476,75 +470,107 @@ async def get_register_by_event_id_info(
 async def register_for_event_by_id(
     identifier: int | str,
     registration_fields: EventRegistrationSchema,
-    token: str = Depends(oauth_scheme),
+    user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session)
 ):
-    user = await get_user_profile_by_email(token, db)
+    event, custom_field_ids = await get_registration_event(identifier, db)
 
-    if identifier.isdigit():
-        stmt = select(Event).where(Event.id == int(identifier)).options(
-            selectinload(Event.event_dates_times),
-            selectinload(Event.custom_fields)
-        )
-        event_result = await db.execute(stmt)
-        event = event_result.scalar_one_or_none()
+    return await register_for_event(
+        event.id, event.ends_at, custom_field_ids, registration_fields, user.id, db, registration_fields.expiration_days
+    )
 
-        if event.status == StatusEnum.close:
-            raise HTTPException(detail="Access to registration on this event provides through special link", status_code=400)
-    else:
-        stmt = select(Event).where( Event.unique_key == identifier).options(
-            selectinload(Event.event_dates_times),
-            selectinload(Event.custom_fields)
+
+@router.post("/waitlist/{identifier}/", response_model=WaitlistPositionSchema)
+async def join_event_waitlist(
+    identifier: int | str,
+    registration_fields: EventRegistrationSchema,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session)
+):
+    event, custom_field_ids = await get_registration_event(identifier, db)
+
+    return await join_waitlist(event.id, event.ends_at, custom_field_ids, registration_fields, user.id, db)
+
+
+@router.get("/waitlist/{event_id}/", response_model=List[WaitlistPositionSchema])
+async def get_waitlist_positions(
+    event_id: int,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session)
+):
+    result = await db.execute(select_waitlist_positions(user.id, event_id))
+
+    return [{"event_date_time_id": row.event_date_time_id, "position": row.position} for row in result.all()]
+
+
+@router.delete("/waitlist/{event_id}/")
+async def leave_waitlist(
+    event_id: int,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_session)
+):
+    stmt = (
+        delete(WaitlistEntry)
+        .where(
+            WaitlistEntry.user_id == user.id,
+            WaitlistEntry.event_date_time_id.in_(select(EventDateTime.id).where(EventDateTime.event_id == event_id)),
         )
-        event_result = await db.execute(stmt)
-        event = event_result.scalar_one_or_none()
-    if event is None:
-        raise HTTPException(status_code=404, detail="Event not found")
-    
-    response = await register_for_event(event, registration_fields, user.id, db, registration_fields.expiration_days)
+        .returning(WaitlistEntry.id)
+    )
+    result = await db.execute(stmt)
+    if not result.scalars().all():
+        return {"msg": "Waitlist entry doesn't exist"}
+
     await db.commit()
 
-    return response
+    return {"msg": "Waitlist entry was deleted"}
 
 
 @router.delete("/cancel-booking/{event_id}/")
 async def cancel_booking(
     event_id: int,
-    token: str = Depends(oauth_scheme),
+    background_tasks: BackgroundTasks,
+    user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session)
 ):
-    user = await get_user_profile_by_email(token, db)
-    stmt = select(Booking).join(EventDateTime).where(EventDateTime.event_id == event_id, Booking.user_id == user.id).options(
-        selectinload(Booking.booking_values)
+    stmt = (
+        delete(Booking)
+        .where(
+            Booking.user_id == user.id,
+            Booking.event_date_time_id.in_(select(EventDateTime.id).where(EventDateTime.event_id == event_id)),
+        )
+        .returning(Booking.event_date_time_id)
     )
     result = await db.execute(stmt)
-    booking = result.scalar_one_or_none()
+    event_date_time_ids = result.scalars().all()
 
-    if not booking:
+    if not event_date_time_ids:
         return {"msg": "Booking doesn't exist"}
-    
-    await db.delete(booking)
-
-    event_date_time_slot_stmt = select(EventDateTime).where(EventDateTime.id == booking.event_date_time_id)
-    existing_event_date_time_slot = await db.execute(event_date_time_slot_stmt)
-    event_date_time_slot = existing_event_date_time_slot.scalar_one_or_none()
-    if event_date_time_slot.seats_number:
-        event_date_time_slot.seats_number += 1
 
+    stmt = (
+        update(EventDateTime)
+        .where(EventDateTime.id.in_(event_date_time_ids), EventDateTime.seats_number != None)
+        .values(seats_number=EventDateTime.seats_number + 1)
+        .returning(EventDateTime.id)
+        .execution_options(synchronize_session=False)
+    )
+    released = await db.execute(stmt)
+    promoted = await promote_waitlisted(released.scalars().all(), db)
     await db.commit()
 
+    # the emails go out after the response is sent
+    background_tasks.add_task(notify_promoted_bookings, promoted)
+
     return {"msg": "Booking was deleted"}
 
 
 @router.get("/member/{event_id}/")
 async def is_event_member(
     event_id: int,
-    token: str = Depends(oauth_scheme),
+    user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session)
     ):
 
-    user = await get_user_profile_by_email(token, db)
-
     stmt = select(Booking).join(EventDateTime).where(EventDateTime.event_id == event_id, Booking.user_id == user.id)
     result = await db.execute(stmt)
     member = bool(result.scalar_one_or_none())
@@ -554,12 +580,10 @@ async def is_event_member(
 @router.get("/members/{event_id}/", response_model=List[EventDateTimeMembersSchema])
 async def get_event_members(
     event_id: int,
-    token: str = Depends(oauth_scheme),
+    user: User = Depends(get_current_user),
     s3_client: S3Client = Depends(get_s3_client),
     db: AsyncSession = Depends(get_async_session)
 ):
-    user = await get_user_profile_by_email(token, db)
-
     stmt = select(Event).where(Event.id == event_id)
     stmt_result = await db.execute(stmt)
     event = stmt_result.scalar_one_or_none()
@@ -672,10 +696,8 @@ async def get_event_members(
 async def send_message_to_event_participants(
     event_id: int,
     message: MessageSchema,
-    token: str = Depends(oauth_scheme),
+    user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session)):
-    user = await get_user_profile_by_email(token, db)
-
     stmt = select(Event).where(Event.id == event_id).options(
         selectinload(Event.event_dates_times).selectinload(EventDateTime.date_time_bookings)
         .selectinload(Booking.user_bookings)
@@ -702,66 +724,53 @@ async def send_message_to_event_participants(
 
 
 @router.get("/cities/")
-async def get_cities(db: AsyncSession = Depends(get_async_session)):
+async def get_cities(db: AsyncSession = Depends(get_async_read_session)):
     stmt = (
         select(distinct(Event.city))
         .where(
             Event.city != None,
             Event.city != "",
             Event.status != StatusEnum.close,
-            ~exists().where(
-                and_(
-                    EventDateTime.event_id == Event.id,
-                    func.concat(
-                        EventDateTime.end_date, ' ', EventDateTime.end_time
-                    ).cast(TIMESTAMP) < datetime.now()
-                )
-            )
+            Event.is_not_finished,
         )
     )
-    result = await db.execute(stmt)
-    cities = result.scalars().all()
 
-    return {"cities": list(cities)}
+    async def create(db: AsyncSession) -> bytes:
+        result = await db.execute(stmt)
+        cities = result.scalars().all()
+        return json.dumps({"cities": list(cities)}, ensure_ascii=False).encode()
+
+    return await get_cached_response("cities", create, db)
 
 
-@router.post("/filter/", response_model=List[EventInfoSchema])
+@router.post("/filter/", response_model=EventPageSchema)
 async def filter_events(
     filters: Optional[FilterSchema] = Body(default=None),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
     s3_client: S3Client = Depends(get_s3_client),
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_async_read_session)
 ):
-    stmt = select(Event).distinct().join(
-        EventDateTime, Event.id == EventDateTime.event_id, isouter=True
-        ).join(User, Event.creator_id == User.id).where(Event.status != StatusEnum.close).order_by(Event.id).options(
-        selectinload(Event.event_dates_times),
-        selectinload(Event.creator)
-    )
-    
+    filters = normalize_filters(filters)
+    stmt = select_event_listings().where(Event.status != StatusEnum.close, Event.is_not_finished)
     conditions = collect_filters(filters)
 
     if conditions:
         stmt = stmt.where(and_(*conditions))
 
-    result = await db.execute(stmt)
-    events = result.scalars().all()
+    # searches list the best matches first
+    rank = get_search_rank(filters.search) if filters and filters.search else None
 
-    filtered_events = [event for event in events if event.state != "Завершено"]
-
-    event_list = get_events(filtered_events, s3_client)
-    
-    return event_list
+    return await get_cached_events_page(f"filter:{get_filters_cache_key(filters)}", stmt, limit, cursor, s3_client, db, rank)
 
 
 @router.post("/invite-team/{event_id}/")
 async def send_event_invitation_to_team_members(
     event_id: int,
     team_invitation: TeamInvitationSchema,
-    token: str = Depends(oauth_scheme),
+    user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session)
     ):
-    user = await get_user_profile_by_email(token, db)
-
     stmt = select(Event).where(Event.id == event_id)
     stmt_result = await db.execute(stmt)
     event = stmt_result.scalar_one_or_none()
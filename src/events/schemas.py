@@ -111,6 +111,11 @@ class EventRegistrationSchema(BaseModel):
         return value
 
 
+class WaitlistPositionSchema(BaseModel):
+    event_date_time_id: int
+    position: int
+
+
 class EventStartTimeSchema(BaseModel):
     start_time: time
 
@@ -133,6 +138,11 @@ class EventInfoSchema(BaseModel):
     photo_url: Optional[AnyHttpUrl]
 
 
+class EventPageSchema(BaseModel):
+    items: List[EventInfoSchema]
+    next_cursor: Optional[str] = None
+
+
 class ContactsSchema(BaseModel):
     email: str
     phone_number: Optional[str]
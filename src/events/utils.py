@@ -1,40 +1,214 @@
-from fastapi import UploadFile, Body, HTTPException, Depends
+from fastapi import UploadFile, Body, HTTPException, Depends, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_, func
+from sqlalchemy import select, update, insert, delete, or_, and_, func, exists, literal, literal_column, values, column, true, cast, String, Integer, DateTime, Select
+from sqlalchemy.orm import aliased
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from src.auth.models import User
-from src.events.models import Event, EventFile, CustomField, Booking, CustomValue, EventDateTime, StatusEnum
-from src.events.schemas import EventCreateSchema, EmailSchema, EventRegistrationSchema, FilterSchema, UpdateCustomFieldSchema, UpdateEventDateTimeSchema, EventDateTimeSchema
+from src.events.models import Event, EventFile, CustomField, Booking, CustomValue, EventDateTime, WaitlistEntry, StatusEnum, FormatEnum, get_event_state
+from src.events.schemas import EventCreateSchema, EmailSchema, EventRegistrationSchema, FilterSchema, UpdateCustomFieldSchema, UpdateEventDateTimeSchema, EventDateTimeSchema, EventPageSchema
 from cryptography.fernet import Fernet
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from typing import List, Optional
-from src.database import async_session_maker
+from typing import List, Optional, Awaitable, Callable
+from src.database import async_session_maker, delete_in_batches, is_replica_session
+from src.auth.utils import refresh_revoked_tokens, clean_revoked_tokens
+from src.idempotency.middleware import clean_idempotency_keys
+from src.cache import ResponseCache, build_cache_backend
 from email.message import EmailMessage
-from src.config import REGISTATION_LINK_CIPHER_KEY, EMAIL_SENDER, EMAIL_PASSWORD, EMAIL_HOST, EMAIL_PORT
+from src.config import REGISTATION_LINK_CIPHER_KEY, EMAIL_SENDER, EMAIL_PASSWORD, EMAIL_HOST, EMAIL_PORT, REVOKED_TOKENS_REFRESH_INTERVAL, REVOKED_TOKENS_CLEANUP_INTERVAL, IDEMPOTENCY_CLEANUP_INTERVAL, RESPONSE_CACHE_TTL, DATABASE_REPLICA_MAX_LAG, DATABASE_REPLICA_CHECK_INTERVAL, EXPIRED_BOOKINGS_SWEEP_INTERVAL, EXPIRED_BOOKINGS_SWEEP_BATCH_SIZE, EXPIRED_BOOKINGS_SWEEP_BUDGET
 from src.s3 import S3Client
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date, time
+from time import monotonic
 import secrets
 import base64
+import hashlib
+import json
+import logging
 import aiosmtplib
 
 
 cipher = Fernet(REGISTATION_LINK_CIPHER_KEY.encode())
 
+logger = logging.getLogger("src.events")
+
+expired_bookings_sweeps = {"runs": 0, "expired": 0, "promoted": 0, "last_expired": 0, "last_duration": 0.0}
+
+# public listings, invalidated whenever an event is created, updated or cancelled
+# a replica passes the lag check up to one check interval before it is read
+event_listing_cache = ResponseCache(
+    build_cache_backend(),
+    namespace="event-listings",
+    ttl=RESPONSE_CACHE_TTL,
+    settle_time=DATABASE_REPLICA_MAX_LAG + DATABASE_REPLICA_CHECK_INTERVAL,
+)
+
+def release_seats(released_bookings):
+    # one seat back per released booking, slots without a limit stay unlimited
+    released_seats = (
+        select(released_bookings.c.event_date_time_id, func.count().label("seats"))
+        .group_by(released_bookings.c.event_date_time_id)
+        .subquery()
+    )
+    return (
+        update(EventDateTime)
+        .where(EventDateTime.id == released_seats.c.event_date_time_id, EventDateTime.seats_number != None)
+        .values(seats_number=EventDateTime.seats_number + released_seats.c.seats)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def promote_waitlisted(date_time_ids: List[int], db: AsyncSession):
+    # runs in the transaction that freed the seats, after they were given back,
+    # the slot rows are locked by then so registrations wait for the commit
+    if not date_time_ids:
+        return []
+
+    is_booked = exists().where(
+        Booking.user_id == WaitlistEntry.user_id,
+        Booking.event_date_time_id == WaitlistEntry.event_date_time_id,
+    )
+    # waiters who got a booking some other way leave the queue without a
+    # seat, so the seats are counted against the ones still waiting
+    stale_entries = (
+        delete(WaitlistEntry)
+        .where(WaitlistEntry.event_date_time_id.in_(date_time_ids), is_booked)
+        .cte("stale_entries")
+    )
+    queue = (
+        select(
+            WaitlistEntry.id,
+            EventDateTime.seats_number,
+            func.row_number().over(partition_by=WaitlistEntry.event_date_time_id, order_by=WaitlistEntry.id).label("position"),
+        )
+        .join(EventDateTime, EventDateTime.id == WaitlistEntry.event_date_time_id)
+        .where(EventDateTime.id.in_(date_time_ids), EventDateTime.seats_number > 0, ~is_booked)
+        .subquery()
+    )
+    promoted_entries = (
+        delete(WaitlistEntry)
+        .where(WaitlistEntry.id.in_(select(queue.c.id).where(queue.c.position <= queue.c.seats_number)))
+        .returning(WaitlistEntry.user_id, WaitlistEntry.event_date_time_id, WaitlistEntry.expiration_date, WaitlistEntry.custom_values)
+        .cte("promoted_entries")
+    )
+    promoted_bookings = (
+        pg_insert(Booking)
+        .from_select(
+            ["user_id", "event_date_time_id", "expiration_date"],
+            select(promoted_entries.c.user_id, promoted_entries.c.event_date_time_id, promoted_entries.c.expiration_date),
+        )
+        .on_conflict_do_nothing(constraint="uq_booking_user_id_event_date_time_id")
+        .returning(Booking.id, Booking.user_id, Booking.event_date_time_id)
+        .cte("promoted_bookings")
+    )
+    entry_values = func.jsonb_each_text(promoted_entries.c.custom_values).table_valued("key", "value").lateral("entry_values")
+    promoted_values = (
+        insert(CustomValue)
+        .from_select(
+            ["value", "custom_field_id", "booking_id"],
+            select(entry_values.c.value, CustomField.id, promoted_bookings.c.id)
+            .select_from(promoted_bookings)
+            .join(
+                promoted_entries,
+                and_(
+                    promoted_entries.c.user_id == promoted_bookings.c.user_id,
+                    promoted_entries.c.event_date_time_id == promoted_bookings.c.event_date_time_id,
+                ),
+            )
+            .join(entry_values, true())
+            # fields removed by the organizer since the user joined are skipped
+            .join(CustomField, CustomField.id == cast(entry_values.c.key, Integer)),
+        )
+        .cte("promoted_values")
+    )
+    taken_seats = (
+        select(promoted_bookings.c.event_date_time_id, func.count().label("seats"))
+        .group_by(promoted_bookings.c.event_date_time_id)
+        .subquery()
+    )
+    take_seats = (
+        update(EventDateTime)
+        .where(EventDateTime.id == taken_seats.c.event_date_time_id)
+        .values(seats_number=EventDateTime.seats_number - taken_seats.c.seats)
+        .cte("take_seats")
+    )
+    stmt = (
+        select(User.email, Event.name)
+        .select_from(promoted_bookings)
+        .join(User, User.id == promoted_bookings.c.user_id)
+        .join(EventDateTime, EventDateTime.id == promoted_bookings.c.event_date_time_id)
+        .join(Event, Event.id == EventDateTime.event_id)
+        .add_cte(promoted_values, take_seats, stale_entries)
+    )
+    result = await db.execute(stmt)
+    return result.all()
+
+
+async def notify_promoted_bookings(promoted):
+    # sent after the commit, a failed email doesn't undo the booking
+    for email, event_name in promoted:
+        try:
+            await send_message_to_email(
+                "Место на мероприятии освободилось",
+                f"Вы были в листе ожидания мероприятия '{event_name}' и теперь зарегистрированы на него",
+                email,
+            )
+        except Exception as e:
+            logger.warning(f"Error sending waitlist promotion email: {e}")
+
+
+def get_expired_bookings_sweep_stats() -> dict:
+    return dict(expired_bookings_sweeps)
+
+
 async def delete_expired_bookings():
+    # each batch deletes its bookings, gives their seats back and promotes
+    # waiters in one short transaction
+    started_at = monotonic()
+    promoted = []
+
     async with async_session_maker() as db:
-        stmt = select(Booking).where(Booking.expiration_date <= datetime.utcnow())
-        expired_bookings = await db.execute(stmt)
-        for booking in expired_bookings.scalars().all():
-            await db.delete(booking)
-            event_date_time_slot_stmt = select(EventDateTime).where(EventDateTime.id == booking.event_date_time_id)
-            existing_event_date_time_slot = await db.execute(event_date_time_slot_stmt)
-            event_date_time_slot = existing_event_date_time_slot.scalar_one_or_none()
-            event_date_time_slot.seats_number += 1
-        await db.commit()
+        async def expire_batch(batch_ids) -> int:
+            expired_bookings = (
+                delete(Booking)
+                .where(Booking.id.in_(batch_ids))
+                .returning(Booking.event_date_time_id)
+                .cte("expired_bookings")
+            )
+            stmt = (
+                select(expired_bookings.c.event_date_time_id, func.count().label("bookings"))
+                .group_by(expired_bookings.c.event_date_time_id)
+                .add_cte(release_seats(expired_bookings).cte("released_seats"))
+            )
+            released = (await db.execute(stmt)).all()
+            promoted.extend(await promote_waitlisted([row.event_date_time_id for row in released], db))
+            return sum(row.bookings for row in released)
+
+        expired = await delete_in_batches(
+            db,
+            Booking,
+            Booking.expiration_date <= datetime.utcnow(),
+            EXPIRED_BOOKINGS_SWEEP_BATCH_SIZE,
+            EXPIRED_BOOKINGS_SWEEP_BUDGET,
+            delete_batch=expire_batch,
+        )
+
+    duration = monotonic() - started_at
+    expired_bookings_sweeps["runs"] += 1
+    expired_bookings_sweeps["expired"] += expired
+    expired_bookings_sweeps["promoted"] += len(promoted)
+    expired_bookings_sweeps["last_expired"] = expired
+    expired_bookings_sweeps["last_duration"] = round(duration, 3)
+    logger.info(json.dumps({"job": "delete_expired_bookings", "expired": expired, "promoted": len(promoted), "duration_s": round(duration, 3)}))
+
+    await notify_promoted_bookings(promoted)
+    return expired
 
 
 async def schedule_jobs():
     scheduler = AsyncIOScheduler()
-    scheduler.add_job(delete_expired_bookings, "interval", hours=1)
+    scheduler.add_job(delete_expired_bookings, "interval", seconds=EXPIRED_BOOKINGS_SWEEP_INTERVAL)
+    scheduler.add_job(refresh_revoked_tokens, "interval", seconds=REVOKED_TOKENS_REFRESH_INTERVAL)
+    scheduler.add_job(clean_revoked_tokens, "interval", seconds=REVOKED_TOKENS_CLEANUP_INTERVAL)
+    scheduler.add_job(clean_idempotency_keys, "interval", seconds=IDEMPOTENCY_CLEANUP_INTERVAL)
     scheduler.start()
 
 
@@ -89,6 +263,27 @@ def add_dates_and_times_to_event(new_event: Event, event: EventCreateSchema = Bo
 
         new_event.event_dates_times.append(new_event_date_time)
 
+    new_event.starts_at, new_event.ends_at = get_event_time_bounds(event.event_dates_times)
+
+
+def get_event_time_bounds(event_dates_times: List[EventDateTimeSchema]):
+    if not event_dates_times:
+        return None, None
+
+    starts_at = min(datetime.combine(date_time.start_date, date_time.start_time) for date_time in event_dates_times)
+    ends_at = max(datetime.combine(date_time.end_date, date_time.end_time) for date_time in event_dates_times)
+
+    return starts_at, ends_at
+
+
+async def refresh_event_time_bounds(event: Event, db: AsyncSession):
+    stmt = select(
+        func.min(EventDateTime.start_date + EventDateTime.start_time),
+        func.max(EventDateTime.end_date + EventDateTime.end_time),
+    ).where(EventDateTime.event_id == event.id)
+    result = await db.execute(stmt)
+    event.starts_at, event.ends_at = result.one()
+
 
 async def update_custom_fields_for_event(event: Event, custom_fields: List[UpdateCustomFieldSchema], db: AsyncSession):
     for field_data in custom_fields:
@@ -228,9 +423,48 @@ def get_event_schedule_url(event: Event, s3_client: S3Client):
     return schedule_url
 
 
-def get_event_info(event: Event, s3_client: S3Client):
-    start_date, end_date, start_time, end_time = get_start_and_end_dates_and_times(event)
-    
+class EventListing:
+    # what a listing needs from an event, kept out of the identity map
+    __slots__ = ("id", "name", "city", "visit_cost", "format", "photo", "starts_at", "ends_at", "rank")
+
+    def __init__(self, id: int, name: str, city: Optional[str], visit_cost: float, format: FormatEnum,
+                 photo: Optional[str], starts_at: Optional[datetime], ends_at: Optional[datetime],
+                 rank: Optional[float] = None):
+        self.id = id
+        self.name = name
+        self.city = city
+        self.visit_cost = visit_cost
+        self.format = format
+        self.photo = photo
+        self.starts_at = starts_at
+        self.ends_at = ends_at
+        self.rank = rank
+
+    @property
+    def state(self) -> str:
+        return get_event_state(self.starts_at, self.ends_at)
+
+
+def select_event_listings() -> Select:
+    return select(Event.id, Event.name, Event.city, Event.visit_cost, Event.format, Event.photo,
+                  Event.starts_at, Event.ends_at)
+
+
+async def get_event_listings(stmt: Select, db: AsyncSession) -> List[EventListing]:
+    result = await db.execute(stmt)
+    return [EventListing(*row) for row in result]
+
+
+def split_date_and_time(value: Optional[datetime]) -> tuple[Optional[date], Optional[time]]:
+    if value is None:
+        return None, None
+    return value.date(), value.time()
+
+
+def get_event_info(event: EventListing | Event, s3_client: S3Client):
+    start_date, start_time = split_date_and_time(event.starts_at)
+    end_date, end_time = split_date_and_time(event.ends_at)
+
     photo_url = get_event_photo_url(event, s3_client)
 
     event_info = {
@@ -326,7 +560,42 @@ def get_event(event: Event, s3_client: S3Client):
     return event_info
 
 
-def get_events(events: List[Event], s3_client: S3Client):
+async def get_event_etag(condition, db: AsyncSession):
+    # everything the detail page shows changes one of these: the event row,
+    # the set of bookings, the creator's profile or the state over time
+    bookings = (
+        select(func.count(Booking.id), func.max(Booking.id))
+        .join(EventDateTime, Booking.event_date_time_id == EventDateTime.id)
+        .where(EventDateTime.event_id == Event.id)
+    )
+    stmt = (
+        select(
+            Event.id, Event.status, Event.updated_at, Event.starts_at, Event.ends_at,
+            bookings.with_only_columns(func.count(Booking.id)).scalar_subquery(),
+            bookings.with_only_columns(func.max(Booking.id)).scalar_subquery(),
+            User.first_name, User.last_name, User.patronymic, User.company_name, User.photo,
+            User.email, User.phone_number, User.vk, User.telegram, User.whatsapp,
+        )
+        .outerjoin(User, Event.creator_id == User.id)
+        .where(condition)
+    )
+    result = await db.execute(stmt)
+    row = result.one_or_none()
+    if row is None:
+        return None, None
+
+    version = json.dumps([*row, get_event_state(row.starts_at, row.ends_at)], default=str)
+    return f'"{hashlib.sha256(version.encode()).hexdigest()[:32]}"', row.status
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def get_events(events: List[EventListing], s3_client: S3Client):
     event_list = []
     for event in events:
         event_info = get_event_info(event, s3_client)
@@ -335,73 +604,323 @@ def get_events(events: List[Event], s3_client: S3Client):
     return event_list
 
 
+def encode_cursor(event: EventListing) -> str:
+    if event.rank is not None:
+        position = event.rank
+    else:
+        position = event.starts_at.isoformat() if event.starts_at else None
+    return base64.urlsafe_b64encode(json.dumps([position, event.id]).encode()).decode()
+
+
+def decode_cursor(cursor: str, parse_position: Callable):
+    try:
+        position, event_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return parse_position(position), int(event_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def parse_starts_at(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def paginate_events(stmt: Select, limit: int, cursor: Optional[str] = None) -> Select:
+    # keyset on (starts_at, id), events without dates go last
+    if cursor:
+        starts_at, event_id = decode_cursor(cursor, parse_starts_at)
+        if starts_at is None:
+            stmt = stmt.where(Event.starts_at == None, Event.id > event_id)
+        else:
+            stmt = stmt.where(
+                or_(
+                    Event.starts_at > starts_at,
+                    and_(Event.starts_at == starts_at, Event.id > event_id),
+                    Event.starts_at == None,
+                )
+            )
+
+    return stmt.order_by(Event.starts_at.asc().nulls_last(), Event.id).limit(limit + 1)
+
+
+def paginate_ranked_events(stmt: Select, rank, limit: int, cursor: Optional[str] = None) -> Select:
+    # keyset on (rank desc, id), the rank is recomputed identically on every page
+    if cursor:
+        last_rank, event_id = decode_cursor(cursor, float)
+        stmt = stmt.where(or_(rank < last_rank, and_(rank == last_rank, Event.id > event_id)))
+
+    return stmt.order_by(rank.desc(), Event.id).limit(limit + 1)
+
+
+def get_search_query(search: str):
+    russian = literal_column("'russian'::regconfig")
+    simple = literal_column("'simple'::regconfig")
+    return func.websearch_to_tsquery(russian, search).op("||")(func.websearch_to_tsquery(simple, search))
+
+
+def get_search_condition(search: str):
+    # a full text match, or a word in the name close enough to forgive a typo
+    return or_(
+        Event.search_vector.bool_op("@@")(get_search_query(search)),
+        literal(search).bool_op("<%")(Event.name),
+    )
+
+
+def get_search_rank(search: str):
+    return func.ts_rank_cd(Event.search_vector, get_search_query(search)) + func.word_similarity(search, Event.name)
+
+
+def is_booked_by_user(user_id: int):
+    # correlated to the enclosing Event, one index probe per event instead of a join
+    return exists().where(
+        EventDateTime.event_id == Event.id,
+        Booking.event_date_time_id == EventDateTime.id,
+        Booking.user_id == user_id,
+    )
+
+
+def get_events_page(events: List[EventListing], limit: int, s3_client: S3Client):
+    page = events[:limit]
+    next_cursor = encode_cursor(page[-1]) if len(events) > limit else None
+
+    return {"items": get_events(page, s3_client), "next_cursor": next_cursor}
+
+
+def get_expiration_date(event_ends_at: Optional[datetime], expiration_days: Optional[int]) -> Optional[datetime]:
+    if expiration_days is None or event_ends_at is None:
+        return None
+    return event_ends_at + timedelta(days=expiration_days)
+
+
+def get_registration_values(custom_field_ids: dict[str, int], registration_fields: EventRegistrationSchema) -> dict[int, str]:
+    return {
+        custom_field_ids[field_data.title]: field_data.value
+        for field_data in registration_fields.custom_fields or []
+        if field_data.title in custom_field_ids
+    }
+
+
+def select_registration_event(condition):
+    # one row per custom field, or a single row with NULLs when there are none
+    return (
+        select(Event.id, Event.status, Event.ends_at, CustomField.id.label("custom_field_id"), CustomField.title)
+        .outerjoin(CustomField, CustomField.event_id == Event.id)
+        .where(condition)
+    )
+
+
+async def get_registration_event(identifier: str, db: AsyncSession):
+    if identifier.isdigit():
+        condition = Event.id == int(identifier)
+    else:
+        condition = Event.unique_key == identifier
+
+    event_rows = (await db.execute(select_registration_event(condition))).all()
+    if not event_rows:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    event = event_rows[0]
+    if identifier.isdigit() and event.status == StatusEnum.close:
+        raise HTTPException(detail="Access to registration on this event provides through special link", status_code=400)
+
+    custom_field_ids = {row.title: row.custom_field_id for row in event_rows if row.custom_field_id is not None}
+    return event, custom_field_ids
+
+
 async def register_for_event(
-    event: Event,
+    event_id: int,
+    event_ends_at: Optional[datetime],
+    custom_field_ids: dict[str, int],
     registration_fields: EventRegistrationSchema,
     user_id: int,
     db: AsyncSession,
     expiration_days: int,
 ):
     date_time_id = registration_fields.event_date_time_id
-
-    existing_booking_stmt = select(Booking).where(
-        Booking.user_id == user_id,
-        Booking.event_date_time_id == date_time_id
+    expiration_date = get_expiration_date(event_ends_at, expiration_days)
+
+    # the seat, the booking and the custom values go in with one statement,
+    # the seat check and decrement are one UPDATE so concurrent registrations
+    # queue on the slot row and can't take the same seat twice. While anyone
+    # is on the waitlist the free seats are theirs
+    reserved_seat = (
+        update(EventDateTime)
+        .where(
+            EventDateTime.id == date_time_id,
+            EventDateTime.event_id == event_id,
+            or_(EventDateTime.seats_number == None, EventDateTime.seats_number > 0),
+            ~exists().where(Booking.user_id == user_id, Booking.event_date_time_id == date_time_id),
+            ~exists().where(WaitlistEntry.event_date_time_id == date_time_id),
+        )
+        .values(seats_number=EventDateTime.seats_number - 1)
+        .returning(EventDateTime.id)
+        .cte("reserved_seat")
     )
-    existing_booking = await db.execute(existing_booking_stmt)
-    if existing_booking.scalar_one_or_none() is not None:
-        raise HTTPException(status_code=400, detail="You are already registered for this event at the selected time.")
-    
-    selected_event_date_time = None
-    for event_date_time in event.event_dates_times:
-        if event_date_time.id == date_time_id:
-            selected_event_date_time = date_time_id
-            break
-    
-    if selected_event_date_time is None:
+    new_booking = (
+        pg_insert(Booking)
+        .from_select(
+            ["user_id", "event_date_time_id", "expiration_date"],
+            select(literal(user_id), reserved_seat.c.id, literal(expiration_date, DateTime)),
+        )
+        .on_conflict_do_nothing(constraint="uq_booking_user_id_event_date_time_id")
+        .returning(Booking.id)
+        .cte("new_booking")
+    )
+    stmt = select(
+        select(reserved_seat.c.id).scalar_subquery().label("reserved_seat_id"),
+        select(new_booking.c.id).scalar_subquery().label("booking_id"),
+        exists().where(EventDateTime.id == date_time_id, EventDateTime.event_id == event_id).label("date_time_exists"),
+        exists().where(Booking.user_id == user_id, Booking.event_date_time_id == date_time_id).label("already_registered"),
+        exists().where(WaitlistEntry.event_date_time_id == date_time_id).label("waitlisted"),
+    )
+
+    custom_values = [
+        (value, custom_field_id)
+        for custom_field_id, value in get_registration_values(custom_field_ids, registration_fields).items()
+    ]
+    if custom_values:
+        registration_values = values(
+            column("value", String), column("custom_field_id", Integer), name="registration_values"
+        ).data(custom_values)
+        stmt = stmt.add_cte(
+            insert(CustomValue)
+            .from_select(
+                ["value", "custom_field_id", "booking_id"],
+                select(registration_values.c.value, registration_values.c.custom_field_id, new_booking.c.id),
+            )
+            .cte("new_custom_values")
+        )
+
+    result = (await db.execute(stmt)).one()
+
+    if not result.date_time_exists:
         raise HTTPException(status_code=404, detail="Selected date or time not found")
-    
-    event_date_time_slot_stmt = select(EventDateTime).where(EventDateTime.id == selected_event_date_time)
-    existing_event_date_time_slot = await db.execute(event_date_time_slot_stmt)
-    event_date_time_slot = existing_event_date_time_slot.scalar_one_or_none()
-    if event_date_time_slot.seats_number:
-        if event_date_time_slot.seats_number <= 0:
+
+    if result.booking_id is None:
+        # a seat taken by a concurrent duplicate is returned by the rollback
+        await db.rollback()
+        if result.reserved_seat_id is None and not result.already_registered:
+            if result.waitlisted:
+                raise HTTPException(status_code=400, detail="Seats for the selected time go to the waitlist first, join it instead")
             raise HTTPException(status_code=400, detail="No seats available for the selected time")
+        raise HTTPException(status_code=400, detail="You are already registered for this event at the selected time.")
+
+    await db.commit()
+
+    return {"message": "Successfully registered for the event"}
 
-        event_date_time_slot.seats_number -= 1
 
-    event_end_date = max(
-        datetime.combine(event_date_time.end_date, event_date_time.end_time)
-        for event_date_time in event.event_dates_times
+def select_waitlist_positions(user_id: int, event_id: int):
+    queued = aliased(WaitlistEntry)
+    position = (
+        select(func.count(queued.id))
+        .where(queued.event_date_time_id == WaitlistEntry.event_date_time_id, queued.id <= WaitlistEntry.id)
+        .scalar_subquery()
     )
-    expiration_date = None
-    if expiration_days is not None:
-        expiration_date = event_end_date + timedelta(days=expiration_days)
-
-    db.add(event_date_time_slot)
-    booking = Booking(user_id=user_id, 
-                      booking_date_time=event_date_time_slot, 
-                      expiration_date=expiration_date)
-    db.add(booking)
-    await db.flush()
-    
-    if event.custom_fields:
-        for field_data in registration_fields.custom_fields:
-            matched_field = next(
-                (cf for cf in event.custom_fields if cf.title == field_data.title),
-                None,
-            )
-            if matched_field:
-                custom_value = CustomValue(
-                    value=field_data.value,
-                    custom_field_id=matched_field.id,
-                    booking_id=booking.id,
-                )
-                db.add(custom_value)
-    
+    return (
+        select(WaitlistEntry.event_date_time_id, position.label("position"))
+        .join(EventDateTime, EventDateTime.id == WaitlistEntry.event_date_time_id)
+        .where(WaitlistEntry.user_id == user_id, EventDateTime.event_id == event_id)
+        .order_by(WaitlistEntry.event_date_time_id)
+    )
+
+
+async def join_waitlist(
+    event_id: int,
+    event_ends_at: Optional[datetime],
+    custom_field_ids: dict[str, int],
+    registration_fields: EventRegistrationSchema,
+    user_id: int,
+    db: AsyncSession,
+):
+    date_time_id = registration_fields.event_date_time_id
+
+    # the slot row stays locked until the commit, a cancellation freeing a
+    # seat meanwhile waits for it and then promotes this entry
+    slot_stmt = (
+        select(
+            EventDateTime.seats_number,
+            exists().where(Booking.user_id == user_id, Booking.event_date_time_id == date_time_id).label("already_registered"),
+            exists().where(WaitlistEntry.event_date_time_id == date_time_id).label("waitlisted"),
+        )
+        .where(EventDateTime.id == date_time_id, EventDateTime.event_id == event_id)
+        .with_for_update(of=EventDateTime)
+    )
+    slot = (await db.execute(slot_stmt)).one_or_none()
+    if slot is None:
+        raise HTTPException(status_code=404, detail="Selected date or time not found")
+    if slot.already_registered:
+        raise HTTPException(status_code=400, detail="You are already registered for this event at the selected time.")
+    if (slot.seats_number is None or slot.seats_number > 0) and not slot.waitlisted:
+        raise HTTPException(status_code=400, detail="Seats are available for the selected time, register instead")
+
+    entry_stmt = (
+        pg_insert(WaitlistEntry)
+        .values(
+            user_id=user_id,
+            event_date_time_id=date_time_id,
+            expiration_date=get_expiration_date(event_ends_at, registration_fields.expiration_days),
+            custom_values={
+                str(custom_field_id): value
+                for custom_field_id, value in get_registration_values(custom_field_ids, registration_fields).items()
+            },
+        )
+        .on_conflict_do_nothing(constraint="uq_waitlist_entry_user_id_event_date_time_id")
+        .returning(WaitlistEntry.id)
+    )
+    if (await db.execute(entry_stmt)).scalar_one_or_none() is None:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="You are already on the waitlist for this event at the selected time.")
+
+    position = (await db.execute(
+        select_waitlist_positions(user_id, event_id).where(WaitlistEntry.event_date_time_id == date_time_id)
+    )).one()
     await db.commit()
 
-    return {"message": "Successfully registered for the event"}
+    return {"event_date_time_id": position.event_date_time_id, "position": position.position}
+
+
+def normalize_filters(filters: Optional[FilterSchema]) -> Optional[FilterSchema]:
+    # city and search are matched with ILIKE, so case and surrounding spaces don't matter
+    if not filters:
+        return None
+
+    def normalize(value: Optional[str]) -> Optional[str]:
+        return (value or "").strip().lower() or None
+
+    return filters.model_copy(update={"city": normalize(filters.city), "search": normalize(filters.search)})
+
+
+def get_filters_cache_key(filters: Optional[FilterSchema]) -> str:
+    fields = filters.model_dump(mode="json", exclude_none=True) if filters else {}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
+
+async def get_cached_response(key: str, create: Callable[[AsyncSession], Awaitable[bytes]], db: AsyncSession) -> Response:
+    async def fill() -> bytes:
+        # right after an invalidation a lagging replica may not have the write
+        # yet, and its page would be cached under the new generation for the
+        # whole TTL, so those fills go to the primary
+        if is_replica_session(db) and await event_listing_cache.recently_invalidated():
+            async with async_session_maker() as primary:
+                return await create(primary)
+        return await create(db)
+
+    content = await event_listing_cache.get_or_create(key, fill)
+    return Response(content=content, media_type="application/json")
+
+
+async def get_cached_events_page(key: str, stmt: Select, limit: int, cursor: Optional[str],
+                                 s3_client: S3Client, db: AsyncSession, rank=None) -> Response:
+    async def create(db: AsyncSession) -> bytes:
+        if rank is not None:
+            page_stmt = paginate_ranked_events(stmt.add_columns(rank), rank, limit, cursor)
+        else:
+            page_stmt = paginate_events(stmt, limit, cursor)
+        events = await get_event_listings(page_stmt, db)
+        page = EventPageSchema.model_validate(get_events_page(events, limit, s3_client))
+        return page.model_dump_json().encode()
+
+    return await get_cached_response(f"{key}:{limit}:{cursor}", create, db)
 
 
 def collect_filters(filters: Optional[FilterSchema]):
@@ -417,21 +936,16 @@ def collect_filters(filters: Optional[FilterSchema]):
         conditions.append(Event.city.ilike(f"%{filters.city}%"))
 
     if filters.search:
-        search = f"%{filters.search}%"
-        conditions.append(
-            or_(
-                Event.name.ilike(search),
-                User.first_name.ilike(search),
-                User.last_name.ilike(search),
-                User.patronymic.ilike(search),
-                User.company_name.ilike(search)
-            )
-        )
+        conditions.append(get_search_condition(filters.search))
 
+    # both bounds apply to the same slot
+    slot_conditions = []
     if filters.date_start is not None:
-        conditions.append(EventDateTime.start_date >= filters.date_start)
+        slot_conditions.append(EventDateTime.start_date >= filters.date_start)
     if filters.date_end is not None:
-        conditions.append(EventDateTime.end_date <= filters.date_end)
+        slot_conditions.append(EventDateTime.end_date <= filters.date_end)
+    if slot_conditions:
+        conditions.append(Event.event_dates_times.any(and_(*slot_conditions)))
 
     if filters.format:
         conditions.append(Event.format == filters.format)
@@ -0,0 +1,267 @@
+from sqlalchemy import select, update, delete, null
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from src.idempotency.models import IdempotencyKey, MAX_KEY_LENGTH
+from src.database import async_session_maker, delete_in_batches
+from src.config import IDEMPOTENCY_KEY_TTL, IDEMPOTENCY_LOCK_TIMEOUT, IDEMPOTENCY_WAIT_TIMEOUT, IDEMPOTENCY_CLEANUP_BATCH_SIZE, IDEMPOTENCY_CLEANUP_BUDGET
+from datetime import datetime, timedelta
+import asyncio
+import hashlib
+import logging
+import secrets
+import time
+
+
+logger = logging.getLogger("src.idempotency")
+
+IDEMPOTENCY_KEY_HEADER = "idempotency-key"
+# login and registration answer with credentials, those bodies aren't stored
+EXCLUDED_PATH_PREFIXES = ("/api/auth/",)
+
+
+def get_request_digest(scope, headers: Headers, body: bytes) -> str:
+    content_type = headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data") and "boundary=" in content_type:
+        # clients pick a new boundary on every retry
+        boundary = content_type.split("boundary=", 1)[1].split(";", 1)[0].strip('"')
+        body = body.replace(boundary.encode("latin-1"), b"")
+
+    digest = hashlib.sha256()
+    for part in (scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b"")):
+        digest.update(part + b"\0")
+    digest.update(body)
+    return digest.hexdigest()
+
+
+# None when the client went away mid-body: a truncated body must not claim
+# the key, the retry with the full body would be refused as a different request
+async def read_body(receive) -> bytes | None:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+async def claim_key(client_digest: str, key: str, request_digest: str, owner: str) -> int | None:
+    # a new key, or one that expired before the cleanup removed it. Until the
+    # response is stored the claim only lives for the lock timeout and the
+    # running request keeps extending it, so only a worker that died
+    # mid-request loses its claim
+    now = datetime.utcnow()
+    stmt = pg_insert(IdempotencyKey).values(
+        client_digest=client_digest,
+        key=key,
+        request_digest=request_digest,
+        owner=owner,
+        created_at=now,
+        expires_at=now + timedelta(seconds=IDEMPOTENCY_LOCK_TIMEOUT),
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_idempotency_key_client_digest_key",
+        set_={
+            "request_digest": stmt.excluded.request_digest,
+            "owner": stmt.excluded.owner,
+            "status_code": null(),
+            "response_headers": null(),
+            "response_body": null(),
+            "created_at": stmt.excluded.created_at,
+            "expires_at": stmt.excluded.expires_at,
+        },
+        where=IdempotencyKey.expires_at < now,
+    ).returning(IdempotencyKey.id)
+
+    async with async_session_maker() as db:
+        claimed_id = (await db.execute(stmt)).scalar_one_or_none()
+        await db.commit()
+    return claimed_id
+
+
+async def load_key(client_digest: str, key: str):
+    stmt = select(
+        IdempotencyKey.request_digest,
+        IdempotencyKey.status_code,
+        IdempotencyKey.response_headers,
+        IdempotencyKey.response_body,
+    ).where(IdempotencyKey.client_digest == client_digest, IdempotencyKey.key == key)
+
+    async with async_session_maker() as db:
+        return (await db.execute(stmt)).one_or_none()
+
+
+async def extend_claim(claimed_id: int, owner: str) -> bool:
+    stmt = (
+        update(IdempotencyKey)
+        .where(IdempotencyKey.id == claimed_id, IdempotencyKey.owner == owner, IdempotencyKey.status_code == None)
+        .values(expires_at=datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_LOCK_TIMEOUT))
+    )
+    async with async_session_maker() as db:
+        result = await db.execute(stmt)
+        await db.commit()
+    return result.rowcount == 1
+
+
+async def keep_claim(claimed_id: int, owner: str):
+    # runs next to the handler until it finishes
+    while True:
+        await asyncio.sleep(IDEMPOTENCY_LOCK_TIMEOUT / 3)
+        try:
+            if not await extend_claim(claimed_id, owner):
+                return
+        except Exception as e:
+            logger.warning(f"Couldn't extend idempotency key claim {claimed_id}: {e}")
+
+
+async def store_response(claimed_id: int, owner: str, status_code: int, headers: list, body: bytes):
+    stmt = update(IdempotencyKey).where(IdempotencyKey.id == claimed_id, IdempotencyKey.owner == owner).values(
+        status_code=status_code,
+        response_headers=[[name.decode("latin-1"), value.decode("latin-1")] for name, value in headers],
+        response_body=body,
+        expires_at=datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_KEY_TTL),
+    )
+    async with async_session_maker() as db:
+        await db.execute(stmt)
+        await db.commit()
+
+
+async def release_key(claimed_id: int, owner: str):
+    async with async_session_maker() as db:
+        await db.execute(delete(IdempotencyKey).where(IdempotencyKey.id == claimed_id, IdempotencyKey.owner == owner))
+        await db.commit()
+
+
+async def clean_idempotency_keys():
+    async with async_session_maker() as db:
+        return await delete_in_batches(
+            db,
+            IdempotencyKey,
+            IdempotencyKey.expires_at < datetime.utcnow(),
+            IDEMPOTENCY_CLEANUP_BATCH_SIZE,
+            IDEMPOTENCY_CLEANUP_BUDGET,
+        )
+
+
+class IdempotencyMiddleware:
+    # POST requests carrying an Idempotency-Key run once, repeats get the
+    # stored response and duplicates arriving mid-flight wait for it
+    def __init__(self, app, poll_interval: float = 0.1):
+        self.app = app
+        self.poll_interval = poll_interval
+        self._in_flight: dict[tuple[str, str], asyncio.Event] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"].startswith(EXCLUDED_PATH_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        # anonymous clients have nothing to tell them apart, their keys would collide
+        headers = Headers(scope=scope)
+        key = headers.get(IDEMPOTENCY_KEY_HEADER)
+        authorization = headers.get("authorization")
+        if key is None or not authorization:
+            await self.app(scope, receive, send)
+            return
+
+        if not key or len(key) > MAX_KEY_LENGTH:
+            response = JSONResponse({"detail": f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"}, status_code=400)
+            await response(scope, receive, send)
+            return
+
+        body = await read_body(receive)
+        if body is None:
+            return
+        client_digest = hashlib.sha256(authorization.encode()).hexdigest()
+        request_digest = get_request_digest(scope, headers, body)
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_TIMEOUT
+
+        while True:
+            owner = secrets.token_hex(16)
+            claimed_id = await claim_key(client_digest, key, request_digest, owner)
+            if claimed_id is not None:
+                await self.run_once(scope, body, receive, send, (client_digest, key), claimed_id, owner)
+                return
+
+            stored = await load_key(client_digest, key)
+            if stored is None:
+                # the first request failed and gave the key up, try to take it
+                continue
+
+            if stored.request_digest != request_digest:
+                response = JSONResponse({"detail": "Idempotency-Key was already used for a different request"}, status_code=422)
+                await response(scope, receive, send)
+                return
+
+            if stored.status_code is not None:
+                await self.replay(stored, send)
+                return
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                response = JSONResponse({"detail": "A request with this Idempotency-Key is still in progress"}, status_code=409)
+                await response(scope, receive, send)
+                return
+
+            # a request in this process is woken up directly, one running
+            # elsewhere is polled for
+            in_flight = self._in_flight.get((client_digest, key))
+            try:
+                if in_flight is not None:
+                    await asyncio.wait_for(in_flight.wait(), timeout=remaining)
+                else:
+                    await asyncio.sleep(min(self.poll_interval, remaining))
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_once(self, scope, body: bytes, receive, send, in_flight_key: tuple[str, str], claimed_id: int, owner: str):
+        finished = asyncio.Event()
+        self._in_flight[in_flight_key] = finished
+        heartbeat = asyncio.create_task(keep_claim(claimed_id, owner))
+        status_code = None
+        response_headers = []
+        chunks = []
+        body_sent = False
+
+        async def receive_body():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # the body was read already, what's left is the disconnect
+            return await receive()
+
+        async def send_and_record(message):
+            nonlocal status_code, response_headers
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_headers = message.get("headers", [])
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_body, send_and_record)
+        except BaseException:
+            heartbeat.cancel()
+            await release_key(claimed_id, owner)
+            raise
+        else:
+            heartbeat.cancel()
+            # server errors aren't stored, a retry should get another try
+            if status_code is None or status_code >= 500:
+                await release_key(claimed_id, owner)
+            else:
+                await store_response(claimed_id, owner, status_code, response_headers, b"".join(chunks))
+        finally:
+            del self._in_flight[in_flight_key]
+            finished.set()
+
+    async def replay(self, stored, send):
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in stored.response_headers]
+        headers.append((b"idempotent-replayed", b"true"))
+        await send({"type": "http.response.start", "status": stored.status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": stored.response_body, "more_body": False})
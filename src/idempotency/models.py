@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+from src.database import Base
+from datetime import datetime
+
+
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_key"
+    __table_args__ = (
+        UniqueConstraint("client_digest", "key", name="uq_idempotency_key_client_digest_key"),
+        Index("ix_idempotency_key_expires_at", "expires_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    # keys are only unique per client, the digest of its Authorization header
+    client_digest = Column(String(64), nullable=False)
+    key = Column(String(MAX_KEY_LENGTH), nullable=False)
+    request_digest = Column(String(64), nullable=False)
+    # random per claim, a request that lost its claim can't store or release it
+    owner = Column(String(32), nullable=False)
+    # NULL while the first request is still being handled
+    status_code = Column(Integer, nullable=True)
+    response_headers = Column(JSONB, nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
@@ -1,17 +1,23 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from src.auth.utils import clean_revoked_tokens
+from src.auth.utils import load_revoked_tokens, get_password_hashing_stats
 from src.auth.router import router as auth_router
 from src.user_profile.router import router as profile_router
-from src.events.utils import schedule_jobs
+from src.events.utils import schedule_jobs, event_listing_cache, get_expired_bookings_sweep_stats
 from src.events.router import router as events_router
 from src.teams.router import router as teams_router
-from src.database import async_session_maker
+from src.database import async_session_maker, engine, warm_up_pool
+from src.instrumentation import QueryStatsMiddleware
+from src.idempotency.middleware import IdempotencyMiddleware
+from src.user_profile.utils import user_cache
 from fastapi.openapi.utils import get_openapi
 import uvicorn
+import logging
 
 
+logging.basicConfig(level=logging.INFO)
+
 app = FastAPI()
 
 app.include_router(auth_router)
@@ -51,25 +57,47 @@ origins = [
     "*",
 ]
 
+# added before CORS so it sits inside it and its own errors get CORS headers too
+app.add_middleware(IdempotencyMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["GET", "POST", "OPTIONS", "DELETE", "PATCH", "PUT", "HEAD"],
     allow_headers=["Content-Type", "Set-Cookie", "Access-Control-Allow-Headers", "Access-Control-Allow-Origin",
-                   "Authorization", "Content-Length"],
+                   "Authorization", "Content-Length", "Idempotency-Key"],
 )
 
+app.add_middleware(QueryStatsMiddleware)
+
 # app.mount("/media", StaticFiles(directory="media"), name="media")
 
 
+@app.get("/api/metrics/")
+async def get_metrics():
+    return {
+        "user_cache": user_cache.stats(),
+        "password_hashing": get_password_hashing_stats(),
+        "event_listing_cache": event_listing_cache.stats(),
+        "expired_bookings_sweeps": get_expired_bookings_sweep_stats(),
+    }
+
+
 @app.on_event("startup")
 async def on_startup():
+    await warm_up_pool(engine)
+
     async with async_session_maker() as db:
-        await clean_revoked_tokens(db)
+        await load_revoked_tokens(db)
     
     await schedule_jobs()
 
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    await engine.dispose()
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,10 +1,13 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Boolean
+from sqlalchemy import Column, String, Integer, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from src.database import Base
 
 
 class Team(Base):
     __tablename__ = "team"
+    __table_args__ = (
+        Index("ix_team_registration_link", "registration_link"),
+    )
 
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False, unique=True)
@@ -19,6 +22,10 @@ class Team(Base):
 
 class UserTeam(Base):
     __tablename__ = "user_team"
+    __table_args__ = (
+        Index("ix_user_team_team_id_user_id", "team_id", "user_id"),
+        Index("ix_user_team_registration_link", "registration_link"),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("user.id"), nullable=True)
@@ -7,7 +7,7 @@ from src.auth.models import User
 from src.auth.utils import oauth_scheme
 from src.events.utils import upload_photo, create_registration_link, decrypt_registration_link
 from src.teams.utils import get_team, send_invite_to_team_email
-from src.user_profile.utils import get_user_profile_by_email
+from src.user_profile.utils import get_current_user
 from src.database import get_async_session
 from src.s3 import S3Client, get_s3_client
 from typing import Optional, List
@@ -20,13 +20,11 @@ router = APIRouter(
 @router.post("/create/")
 async def create_team(
     team: CreateTeamSchema = Body(...),
-    token: str = Depends(oauth_scheme),
+    user: User = Depends(get_current_user),
     s3_client: S3Client = Depends(get_s3_client),
     db: AsyncSession = Depends(get_async_session),
     photo: Optional[UploadFile] = UploadFile(None)
     ):
-    user = await get_user_profile_by_email(token, db)
-
     photo_path = None
     if photo.filename:
         photo_path = await upload_photo(photo, photo.filename, s3_client)
@@ -73,9 +71,8 @@ async def create_link_for_registration(team_id: int,
 @router.post("/invite/{team_id}/")
 async def invite_in_team(team_id: int,
                          invited_user_email: InvitedUserSchema,
-                         token: str = Depends(oauth_scheme),
+                         user: User = Depends(get_current_user),
                          db: AsyncSession = Depends(get_async_session)):
-    user = await get_user_profile_by_email(token, db)
     team = await get_team(team_id, db)
 
     registration_link = create_registration_link(team_id)
@@ -96,10 +93,8 @@ async def invite_in_team(team_id: int,
 @router.post("/join-link/{registration_link}/")
 async def join_to_team_through_registration_link(
     registration_link: str,
-    token: str = Depends(oauth_scheme),
+    user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session)):
-    user = await get_user_profile_by_email(token, db)
-
     stmt = select(UserTeam).where(
         UserTeam.registration_link == registration_link
     )
@@ -131,10 +126,8 @@ async def join_to_team_through_registration_link(
 @router.post("/join-invitation/{registration_link}/")
 async def join_to_team_through_invitation(
     registration_link: str,
-    token: str = Depends(oauth_scheme),
+    user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session)):
-    user = await get_user_profile_by_email(token, db)
-
     stmt = select(Team).where(Team.registration_link == registration_link)
     stmt_result = await db.execute(stmt)
     team = stmt_result.scalar_one_or_none()
@@ -155,11 +148,9 @@ async def join_to_team_through_invitation(
 
 @router.post("/my/", response_model=List[TeamsInfoSchema])
 async def get_my_teams(
-    token: str = Depends(oauth_scheme),
+    user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session)
 ):
-    user = await get_user_profile_by_email(token, db)
-
     stmt = select(Team).join(UserTeam).where(UserTeam.user_id == user.id,
                                              UserTeam.is_admin == True)
     stmt_result = await db.execute(stmt)
@@ -174,11 +165,9 @@ async def get_my_teams(
 
 @router.post("/participate/", response_model=List[TeamsInfoSchema])
 async def get_my_teams(
-    token: str = Depends(oauth_scheme),
+    user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session)
 ):
-    user = await get_user_profile_by_email(token, db)
-
     stmt = select(Team).join(UserTeam).where(UserTeam.user_id == user.id,
                                              UserTeam.is_admin == False)
     stmt_result = await db.execute(stmt)
@@ -194,10 +183,9 @@ async def get_my_teams(
 @router.get("/members/{team_id}/", response_model=TeamMembersResponseSchema)
 async def get_team_members(
     team_id: int,
-    token: str = Depends(oauth_scheme),
+    user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session)
     ):
-    user = await get_user_profile_by_email(token, db)
     
     stmt = select(UserTeam).where(UserTeam.team_id == team_id,
                                   UserTeam.user_id == user.id)
@@ -233,10 +221,9 @@ async def get_team_members(
 async def remove_from_team(
     team_id: int,
     removed_user: RemoveUserSchema,
-    token: str = Depends(oauth_scheme),
+    user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session)
     ):
-    user = await get_user_profile_by_email(token, db)
     
     stmt = select(UserTeam).where(UserTeam.team_id == team_id,
                                   UserTeam.user_id == user.id,
@@ -265,10 +252,9 @@ async def remove_from_team(
 @router.delete("/exit/{team_id}/")
 async def exit_from_team(
     team_id: int,
-    token: str = Depends(oauth_scheme),
+    user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session)
 ):
-    user = await get_user_profile_by_email(token, db)
     
     stmt = select(UserTeam).where(UserTeam.team_id == team_id,
                                   UserTeam.user_id == user.id,
@@ -288,10 +274,9 @@ async def exit_from_team(
 @router.delete("/delete/{team_id}/")
 async def delete_team(
     team_id: int,
-    token: str = Depends(oauth_scheme),
+    user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session)
 ):
-    user = await get_user_profile_by_email(token, db)
     
     stmt = select(Team).join(UserTeam).where(UserTeam.team_id == team_id,
                                              UserTeam.user_id == user.id,
@@ -2,10 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException, UploadFile, Body
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from src.auth.models import User
-from src.auth.utils import oauth_scheme
 from src.events.utils import upload_photo, get_event_photo_url
 from src.user_profile.schemas import UserProfileSchema, UserProfileUpdateSchema
-from src.user_profile.utils import get_user_profile_by_email
+from src.user_profile.utils import get_current_user, invalidate_cached_user
 from src.s3 import S3Client, get_s3_client
 from src.database import get_async_session
 from typing import Optional
@@ -16,8 +15,7 @@ router = APIRouter(
 )
 
 @router.get("/me/", response_model=UserProfileSchema)
-async def get_user_profile(token: str = Depends(oauth_scheme), s3_client: S3Client = Depends(get_s3_client), db: AsyncSession = Depends(get_async_session)):
-    user_profile = await get_user_profile_by_email(token, db)
+async def get_user_profile(user_profile: User = Depends(get_current_user), s3_client: S3Client = Depends(get_s3_client), db: AsyncSession = Depends(get_async_session)):
     user_profile.photo = get_event_photo_url(user_profile, s3_client)
     return UserProfileSchema.model_validate(user_profile)
 
@@ -26,10 +24,9 @@ async def get_user_profile(token: str = Depends(oauth_scheme), s3_client: S3Clie
 @router.patch("/me/")
 async def update_user_profile(
     profile_data: UserProfileUpdateSchema,
-    token: str = Depends(oauth_scheme),
+    user_profile: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_session)
 ):
-    user_profile = await get_user_profile_by_email(token, db)
     
     if profile_data.email:
         email_check_stmt = select(User).where(User.email == profile_data.email)
@@ -46,18 +43,17 @@ async def update_user_profile(
         await db.commit()
 
     await db.commit()
+    invalidate_cached_user(user_profile.id)
     await db.refresh(user_profile)
 
     return {"msg": "Profile updated"}
 
 
 @router.post("/load-photo/")
-async def load_user_photo(token: str = Depends(oauth_scheme),
+async def load_user_photo(user_profile: User = Depends(get_current_user),
                     s3_client: S3Client = Depends(get_s3_client),
                     photo: Optional[UploadFile] = UploadFile(None),
                     db: AsyncSession = Depends(get_async_session)):
-    user_profile = await get_user_profile_by_email(token, db)
-
     if user_profile.photo:
         return {"msg": "User already has a photo"}
 
@@ -67,18 +63,17 @@ async def load_user_photo(token: str = Depends(oauth_scheme),
         user_profile.photo = photo_path
     
     await db.commit()
+    invalidate_cached_user(user_profile.id)
     return {"msg": "Photo is uploaded"}
 
 
 @router.put("/update-photo/")
 async def update_user_photo(
-    token: str = Depends(oauth_scheme),
+    user_profile: User = Depends(get_current_user),
     s3_client: S3Client = Depends(get_s3_client),
     new_photo: Optional[UploadFile] = UploadFile(None),
     db: AsyncSession = Depends(get_async_session),
 ):
-    user_profile = await get_user_profile_by_email(token, db)
-
     if not new_photo or not new_photo.filename:
         raise HTTPException(status_code=400, detail="Photo doesn't provided")
 
@@ -89,4 +84,5 @@ async def update_user_photo(
     user_profile.photo = new_photo_path
 
     await db.commit()
+    invalidate_cached_user(user_profile.id)
     return {"msg": "Photo updated successfully"}
\ No newline at end of file
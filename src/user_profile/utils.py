@@ -1,18 +1,68 @@
-from fastapi import HTTPException
-from src.auth.models import User
-from src.auth.utils import get_email_from_token
-from sqlalchemy import select
+from fastapi import HTTPException, Depends, Request
+from src.auth.models import User, RevokedToken
+from src.auth.utils import decode_access_token, get_token_digest, get_revocation_digest, revoked_tokens, oauth_scheme
+from src.database import get_async_session
+from src.cache import TTLCache
+from src.config import USER_CACHE_SIZE, USER_CACHE_TTL
+from sqlalchemy import select, exists
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+import time
+
+
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+
+def cache_user(token: str, payload: dict, user: User):
+    fields = {column.key: getattr(user, column.key) for column in User.__table__.columns}
+    user_cache.set(get_token_digest(token), {"user": fields}, ttl=payload["exp"] - time.time())
+
+
+async def restore_cached_user(fields: dict, db: AsyncSession) -> User:
+    # attach the cached row to this session as if it had been loaded, no SELECT is emitted
+    user = User(**fields)
+    make_transient_to_detached(user)
+    return await db.merge(user, load=False)
+
+
+def invalidate_cached_token(token: str):
+    user_cache.delete(get_token_digest(token))
+
+
+def invalidate_cached_user(user_id: int):
+    user_cache.delete_where(lambda entry: entry["user"]["id"] == user_id)
 
 
 async def get_user_profile_by_email(token: str, db: AsyncSession):
-    email = await get_email_from_token(token, db)
+    payload = decode_access_token(token)
+    revocation_digest = get_revocation_digest(token, payload)
+    if revocation_digest in revoked_tokens:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
 
-    stmt = select(User).where(User.email == email)
+    cached = user_cache.get(get_token_digest(token))
+    if cached is not None:
+        return await restore_cached_user(cached["user"], db)
+
+    # the revocation check rides along with the user row, one round trip for both
+    revoked = exists().where(RevokedToken.token_digest == revocation_digest)
+    stmt = select(User, revoked.label("revoked")).where(User.email == payload["sub"])
     result = await db.execute(stmt)
-    user_profile = result.scalar_one_or_none()
+    row = result.one_or_none()
 
-    if user_profile is None:
+    if row is None:
         raise HTTPException(status_code=404, detail="Profile not found")
-    
-    return user_profile
+
+    if row.revoked:
+        revoked_tokens.add(revocation_digest)
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+
+    cache_user(token, payload, row.User)
+    return row.User
+
+
+async def get_current_user(request: Request, token: str = Depends(oauth_scheme), db: AsyncSession = Depends(get_async_session)) -> User:
+    user = getattr(request.state, "user", None)
+    if user is None:
+        user = await get_user_profile_by_email(token, db)
+        request.state.user = user
+    return user